@@ -11,8 +11,9 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -44,6 +45,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'service.metrics.MetricsMiddleware',
+    'service.ratelimit.RateLimitMiddleware',
+    'service.routing.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,12 +84,69 @@ WSGI_APPLICATION = 'avito_test.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'service.pooled_postgresql' if config('DB_POOL', default=False, cast=bool) else 'django.db.backends.postgresql_psycopg2',
         'NAME': config('POSTGRES_DATABASE', default='avito'),
         'USER': config('POSTGRES_USERNAME', default='postgres'),
         'PASSWORD': config('POSTGRES_PASSWORD', default='rootroot'),
         'HOST': config('POSTGRES_HOST', default='127.0.0.1'),
         'PORT': config('POSTGRES_PORT', default=''),
+        'POOL': {
+            'MIN_SIZE': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+            'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=10, cast=float),
+            'IDLE_TIMEOUT': config('DB_POOL_IDLE_TIMEOUT', default=300, cast=float),
+            'HEALTH_CHECK_INTERVAL': config('DB_POOL_HEALTH_CHECK_INTERVAL', default=30, cast=float),
+        },
+    }
+}
+
+# Local development and tests can run on SQLite instead of PostgreSQL.
+SQLITE_PATH = config('SQLITE_PATH', default='')
+if SQLITE_PATH:
+    DATABASES['default'] = {
+        'ENGINE': 'service.sqlite3',
+        'NAME': SQLITE_PATH,
+        # A file rather than the shared in-memory database, where concurrent writers of the
+        # threaded tests fail at once instead of waiting for the lock.
+        'TEST': {'NAME': f'{SQLITE_PATH}.test'},
+    }
+
+# Read replicas: PostgreSQL hosts (host or host:port, same credentials as the primary) or,
+# with SQLITE_PATH, SQLite files. Safe requests read from them, see service/routing.py.
+READ_REPLICAS = []
+for number, replica in enumerate(config('DATABASE_REPLICAS', default='', cast=Csv()), 1):
+    if SQLITE_PATH:
+        replica_settings = {'ENGINE': 'service.sqlite3', 'NAME': replica}
+    else:
+        host, _, port = replica.partition(':')
+        replica_settings = {**DATABASES['default'], 'HOST': host, 'PORT': port}
+    replica_settings['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica{number}'] = replica_settings
+    READ_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['service.routing.ReplicaRouter']
+
+# Seconds a client reads from the primary after a write, to see its own changes.
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Per-client request budgets of write endpoints, "url-name=requests/seconds,...", e.g.
+# "bid-new=30/60,bid-edit=60/60,bid-submit=60/60"; empty turns rate limiting off. The token
+# buckets are shared by all processes of the host through the SQLite file RATE_LIMIT_PATH.
+RATE_LIMITS = config('RATE_LIMITS', default='')
+RATE_LIMIT_PATH = config('RATE_LIMIT_PATH', default=os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'avito_rate_limits.sqlite3'))
+
+# PostgreSQL only: range-partition tenders and bids by month of created_at, see service/partitioning.py.
+PARTITION_TABLES = config('PARTITION_TABLES', default=False, cast=bool)
+# Partitioning drops the foreign keys that reference tenders and bids; the conversion refuses to run without this.
+PARTITION_DROP_FOREIGN_KEYS = config('PARTITION_DROP_FOREIGN_KEYS', default=False, cast=bool)
+# Months of partitions created ahead of the current one by migrate and `manage.py create_partitions`.
+PARTITION_MONTHS_AHEAD = config('PARTITION_MONTHS_AHEAD', default=3, cast=int)
+
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='avito'),
     }
 }
 
@@ -133,3 +194,37 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 SERVER_ADDRESS = config('SERVER_ADDRESS', default='0.0.0.0:8080')
 HOST, PORT = SERVER_ADDRESS.split(':')
+
+PRINCIPAL_CACHE_SIZE = config('PRINCIPAL_CACHE_SIZE', default=10000, cast=int)
+PRINCIPAL_CACHE_TTL = config('PRINCIPAL_CACHE_TTL', default=60, cast=int)
+
+# Seconds an access token from /api/auth/token/ stays valid.
+ACCESS_TOKEN_TTL = config('ACCESS_TOKEN_TTL', default=900, cast=int)
+
+# Set by asgi.py: the hot read endpoints are then routed to the async views.
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+# Every N-th saved tender/bid version keeps the full text, the ones in between store deltas.
+VERSION_KEYFRAME_INTERVAL = config('VERSION_KEYFRAME_INTERVAL', default=20, cast=int)
+
+# Directory of the segment files written by `manage.py archive_versions`. No default: the segments
+# are the only copy of archived versions, so they must go to persistent storage that is backed up.
+VERSION_ARCHIVE_DIR = config('VERSION_ARCHIVE_DIR', default='')
+
+# Background jobs of `manage.py run_worker`, see service/jobs.py: seconds a running job stays
+# claimed without a heartbeat, attempts before a job fails, and delay of the first retry (doubled on each next one).
+JOB_LEASE_SECONDS = config('JOB_LEASE_SECONDS', default=300, cast=int)
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=5, cast=int)
+JOB_RETRY_DELAY = config('JOB_RETRY_DELAY', default=30, cast=int)
+
+# Published tenders older than this many days are closed by the worker, 0 turns auto-close off;
+# it runs every TENDER_AUTO_CLOSE_INTERVAL seconds and closes that many tenders per transaction.
+TENDER_AUTO_CLOSE_DAYS = config('TENDER_AUTO_CLOSE_DAYS', default=0, cast=int)
+TENDER_AUTO_CLOSE_INTERVAL = config('TENDER_AUTO_CLOSE_INTERVAL', default=3600, cast=int)
+TENDER_AUTO_CLOSE_BATCH_SIZE = config('TENDER_AUTO_CLOSE_BATCH_SIZE', default=1000, cast=int)
+
+# Seconds a rendered page of the public tender feed stays cached; writes invalidate it earlier.
+TENDER_FEED_CACHE_TIMEOUT = config('TENDER_FEED_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a change stream stays open; clients reconnect and get a fresh snapshot after that.
+CHANGE_STREAM_TIMEOUT = config('CHANGE_STREAM_TIMEOUT', default=300, cast=int)
@@ -14,28 +14,54 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 
-from service.views import Ping, GetTender, CreateTender, GetUserTenders, TenderStatus, EditTender, RollbackTender, \
-    CreateBid, UserBids, TenderBids, BidStatus, EditBid, SubmitDecision, SendFeedback, RollbackBid, GetFeedback
+from service.metrics import metrics_view
+from service.async_views import AsyncGetTender, AsyncTenderStatus, AsyncUserBids, AsyncTenderBids, AsyncBidStatus, \
+    AsyncChangeStream
+from service.views import Ping, IssueToken, GetTender, CreateTender, GetUserTenders, TenderStatus, EditTender, RollbackTender, \
+    CreateBid, UserBids, TenderBids, BidStatus, EditBid, SubmitDecision, SendFeedback, RollbackBid, GetFeedback, \
+    BulkTenderStatus, BulkBidStatus, BatchStatus, SearchTenders, ChangeStream
 
-urlpatterns = [
+sync_urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/ping/', Ping.as_view(), name='ping'),
+    path('api/auth/token/', IssueToken.as_view(), name='auth-token'),
+    path('api/metrics', metrics_view, name='metrics'),
     path('api/tenders/', GetTender.as_view(), name='tenders'),
+    path('api/tenders/search/', SearchTenders.as_view(), name='tenders-search'),
     path('api/tenders/new/', CreateTender.as_view(), name='tenders-new'),
     path('api/tenders/my/', GetUserTenders.as_view(), name='tenders-my'),
     path('api/tenders/<uuid:tenderId>/status/', TenderStatus.as_view(), name='tender-status'),
+    path('api/tenders/bulk-status/', BulkTenderStatus.as_view(), name='tenders-bulk-status'),
     path('api/tenders/<uuid:tenderId>/edit/', EditTender.as_view(), name='tender-edit'),
     path('api/tenders/<uuid:tenderId>/rollback/<int:version>/', RollbackTender.as_view(), name='tender-rollback'),
     path('api/bids/new/', CreateBid.as_view(), name='bid-new'),
     path('api/bids/my/', UserBids.as_view(), name='bid-my'),
     path('api/bids/<uuid:tenderId>/list/', TenderBids.as_view(), name='bid-list'),
     path('api/bids/<uuid:bidId>/status/', BidStatus.as_view(), name='bid-status'),
+    path('api/bids/bulk-status/', BulkBidStatus.as_view(), name='bids-bulk-status'),
     path('api/bids/<uuid:bidId>/edit/', EditBid.as_view(), name='bid-edit'),
     path('api/bids/<uuid:bidId>/submit-decision/', SubmitDecision.as_view(), name='bid-submit'),
     path('api/bids/<uuid:bidId>/feedback/', SendFeedback.as_view(), name='bid-feedback'),
     path('api/bids/<uuid:bidId>/rollback/<int:version>/', RollbackBid.as_view(), name='bid-rollback'),
     path('api/bids/<uuid:tenderId>/reviews/', GetFeedback.as_view(), name='get-feedback'),
+    path('api/changes/stream/', ChangeStream.as_view(), name='changes-stream'),
+    path('api/statuses/', BatchStatus.as_view(), name='statuses'),
 ]
+
+# Under ASGI the hot read endpoints are served by native async views.
+async_urlpatterns = [
+    path('api/tenders/', AsyncGetTender.as_view(), name='tenders'),
+    path('api/tenders/<uuid:tenderId>/status/', AsyncTenderStatus.as_view(), name='tender-status'),
+    path('api/bids/my/', AsyncUserBids.as_view(), name='bid-my'),
+    path('api/bids/<uuid:tenderId>/list/', AsyncTenderBids.as_view(), name='bid-list'),
+    path('api/bids/<uuid:bidId>/status/', AsyncBidStatus.as_view(), name='bid-status'),
+    path('api/changes/stream/', AsyncChangeStream.as_view(), name='changes-stream'),
+]
+async_names = {pattern.name for pattern in async_urlpatterns}
+async_urlpatterns += [pattern for pattern in sync_urlpatterns if getattr(pattern, 'name', None) not in async_names]
+
+urlpatterns = async_urlpatterns if settings.ASYNC_VIEWS else sync_urlpatterns
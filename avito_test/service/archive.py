@@ -0,0 +1,161 @@
+import json
+import os
+import time
+import zlib
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+
+from service import versions
+from service.models import ArchivedVersion
+
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+# Archived versions live in append-only segment files: every owner's batch of archived versions is
+# one zlib-compressed JSON block ({version: fields}), and ArchivedVersion rows index each version
+# to its block by segment name, offset and length. Segments are only ever appended to while they
+# are written and never change afterwards; reading a version is one indexed row and one seek.
+
+
+class ArchiveError(Exception):
+    # An indexed version whose segment is missing or does not decode: the archive directory is not
+    # the one the index was written with, or a segment was damaged. Never treated as "no such version".
+    pass
+
+
+class SegmentWriter:
+    def __init__(self, kind, directory=None):
+        self.kind = kind
+        self.directory = directory or settings.VERSION_ARCHIVE_DIR
+        self.file = None
+        self.name = None
+
+    def append(self, entries):
+        block = zlib.compress(json.dumps(entries, separators=(',', ':')).encode(), 9)
+        if self.file is None or self.file.tell() and self.file.tell() + len(block) > SEGMENT_MAX_BYTES:
+            self.rotate()
+        offset = self.file.tell()
+        self.file.write(block)
+        return self.name, offset, len(block)
+
+    def rotate(self):
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        self.name = f'{self.kind}-{time.strftime("%Y%m%d%H%M%S")}-{os.getpid()}-{time.monotonic_ns()}.seg'
+        self.file = open(os.path.join(self.directory, self.name), 'xb')
+
+    def sync(self):
+        # Blocks must be on disk before the index rows pointing at them are committed.
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def load(kind, owner_id, version):
+    entry = ArchivedVersion.objects.filter(kind=kind, owner_id=owner_id, version=version) \
+        .values('segment', 'offset', 'length').first()
+    if entry is None:
+        return None
+    try:
+        with open(os.path.join(settings.VERSION_ARCHIVE_DIR, entry['segment']), 'rb') as segment:
+            segment.seek(entry['offset'])
+            block = segment.read(entry['length'])
+        # zlib checks the block's checksum, so a damaged or truncated block fails here.
+        return json.loads(zlib.decompress(block))[str(version)]
+    except (OSError, zlib.error, ValueError, KeyError) as error:
+        raise ArchiveError(f'{kind} {owner_id} version {version} is archived in segment {entry["segment"]}, '
+                           f'which can not be read: {error!r}') from error
+
+
+def owners_to_archive(store, keep_last, before):
+    owners = store.model.objects.values(store.owner_field).annotate(versions=Count('id'), oldest=Min('created_at'))
+    if keep_last is not None:
+        owners = owners.filter(versions__gt=keep_last)
+    if before is not None:
+        owners = owners.filter(oldest__lt=before)
+    return list(owners.values_list(store.owner_field, flat=True))
+
+
+def split(rows, keep_last, before):
+    # Rows come in version order; a version is archived when it matches every given criterion.
+    archived = []
+    for position, row in enumerate(rows):
+        if keep_last is not None and position >= len(rows) - keep_last:
+            break
+        if before is not None and row['created_at'] >= before:
+            break
+        archived.append(row)
+    return archived, rows[len(archived):]
+
+
+def rebase(store, kept, descriptions, archived_versions):
+    # Rows left in the table may be deltas against an archived keyframe. The first of them becomes
+    # the new keyframe, the others are re-encoded against it, so the table never points into the archive.
+    keyframe = None
+    updates = []
+    for row in kept:
+        if row['base_version'] not in archived_versions:
+            continue
+        description = descriptions[row['version']]
+        if keyframe is None:
+            keyframe = row
+            updates.append((row['id'], {'description': description, 'base_version': None, 'delta': None}))
+            continue
+        delta = versions.make_delta(descriptions[keyframe['version']], description)
+        if len(json.dumps(delta)) < len(description):
+            updates.append((row['id'], {'description': '', 'base_version': keyframe['version'], 'delta': delta}))
+        else:
+            updates.append((row['id'], {'description': description, 'base_version': None, 'delta': None}))
+    for row_id, values in updates:
+        store.model.objects.filter(id=row_id).update(**values)
+    return len(updates)
+
+
+def archive_owners(store, owner_ids, keep_last, before, writer):
+    kind = store.model._meta.model_name
+    owner_model = store.model._meta.get_field(store.owner_field).related_model
+    rebased = 0
+    with transaction.atomic():
+        # Edits of these owners wait until the batch is done, so no new delta can pick an archived keyframe.
+        list(owner_model.objects.select_for_update().filter(id__in=owner_ids).values_list('id', flat=True))
+
+        rows_by_owner = {}
+        columns = ['id', f'{store.owner_field}_id', 'version', 'created_at', 'base_version', 'delta', *store.fields]
+        for row in store.model.objects.filter(**{f'{store.owner_field}__in': owner_ids}).order_by('version').values(*columns):
+            rows_by_owner.setdefault(row[f'{store.owner_field}_id'], []).append(row)
+
+        index = []
+        archived_ids = []
+        for owner_id, rows in rows_by_owner.items():
+            archived, kept = split(rows, keep_last, before)
+            if not archived:
+                continue
+
+            by_version = {row['version']: row for row in rows}
+            descriptions = {
+                row['version']: row['description'] if row['delta'] is None
+                else versions.apply_delta(by_version[row['base_version']]['description'], row['delta'])
+                for row in rows
+            }
+            block = {
+                str(row['version']): {**{field: row[field] for field in store.fields}, 'description': descriptions[row['version']]}
+                for row in archived
+            }
+            segment, offset, length = writer.append(block)
+            index += [
+                ArchivedVersion(kind=kind, owner_id=owner_id, version=row['version'], segment=segment, offset=offset, length=length)
+                for row in archived
+            ]
+            archived_ids += [row['id'] for row in archived]
+            rebased += rebase(store, kept, descriptions, {row['version'] for row in archived})
+
+        writer.sync()
+        ArchivedVersion.objects.bulk_create(index)
+        store.model.objects.filter(id__in=archived_ids).delete()
+    return len(archived_ids), rebased
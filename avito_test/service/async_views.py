@@ -0,0 +1,182 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.http import HttpResponse
+from django.views import View
+
+from service import change_stream, feed_cache
+from service.etags import if_none_match, with_etag
+from service.models import Tender, Bid
+from service.principals import aget_principal, caller_username
+from service.serializers import BidSerializer
+from service.streaming import render_json, render_json_array, streaming_response, wants_stream
+from service.views import check_access, check_access_for_bid, akeyset_page, parse_feed_page, published_tenders, \
+    parse_watched_ids, change_snapshot, watched_keys, event_stream_response, MAX_WATCHED_IDS, \
+    TenderStatus, BidStatus
+
+
+def json_response(data, status=200):
+    return HttpResponse(render_json(data), status=status, content_type='application/json')
+
+
+def reason(text, status):
+    return json_response({'reason': text}, status=status)
+
+
+def status_response(request, obj):
+    if if_none_match(request, obj):
+        return with_etag(HttpResponse(status=304), obj)
+    return with_etag(json_response(obj.status), obj)
+
+
+def not_found():
+    return json_response({'detail': 'Not found.'}, status=404)
+
+
+class AsyncAPIView(View):
+    # Like APIView, the API is token-less and does not use CSRF protection.
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+
+class AsyncGetTender(AsyncAPIView):
+    async def get(self, request):
+        service_types = request.GET.getlist('serviceType[]')
+
+        page, error = parse_feed_page(request.GET)
+        if error:
+            return reason(error, 400)
+        limit, raw_cursor, cursor = page
+
+        async def render():
+            tenders, next_cursor = await akeyset_page(published_tenders(service_types), cursor, limit)
+            return render_json_array(tenders), next_cursor
+
+        body, next_cursor = await feed_cache.aget_or_render(service_types, limit, raw_cursor, render)
+        response = HttpResponse(body, content_type='application/json')
+        if next_cursor:
+            response['X-Next-Cursor'] = next_cursor
+        return response
+
+
+class AsyncTenderStatus(AsyncAPIView):
+    async def get(self, request, tenderId):
+        username = caller_username(request)
+
+        try:
+            tender = await Tender.objects.only('status', 'version', 'organization_id').aget(id=tenderId)
+        except Tender.DoesNotExist:
+            return not_found()
+
+        if tender.status != 'Published':
+            principal = await aget_principal(request, username)
+            if principal is None:
+                return reason(f'user with username {username} does not exist', 401)
+
+            if not check_access(tender, principal):
+                return reason('tender is not published, you do not have access because you do not belong to tender organizarion', 403)
+
+        return status_response(request, tender)
+
+    async def put(self, request, tenderId):
+        return await sync_to_async(TenderStatus.as_view())(request, tenderId=tenderId)
+
+
+class AsyncUserBids(AsyncAPIView):
+    async def get(self, request):
+        username = caller_username(request)
+
+        if len(username) > 50:
+            return reason('username must be 50 cherecters length maximum', 400)
+
+        principal = await aget_principal(request, username)
+        if principal is None:
+            return reason(f'user with username {username} does not exist', 401)
+
+        bids = Bid.objects.filter(Q(creator_id=principal.employee_id) | Q(organization__in=principal.organization_ids)).order_by('name')
+
+        if wants_stream(request):
+            return streaming_response(request, bids, BidSerializer.Meta.fields)
+
+        bids = bids.values(*BidSerializer.Meta.fields)
+        return HttpResponse(render_json_array([bid async for bid in bids]), content_type='application/json')
+
+
+class AsyncTenderBids(AsyncAPIView):
+    async def get(self, request, tenderId):
+        username = caller_username(request)
+
+        if len(username) > 50:
+            return reason('username must be 50 cherecters length maximum', 400)
+
+        principal = await aget_principal(request, username)
+        if principal is None:
+            return reason(f'user with username {username} does not exist', 401)
+
+        try:
+            tender = await Tender.objects.only('organization_id', 'created_at').aget(id=tenderId)
+        except Tender.DoesNotExist:
+            return not_found()
+
+        if not check_access(tender, principal):
+            return reason('you do not have access because you do not belong to tender organizarion', 403)
+
+        bids = Bid.objects.filter(tender=tender, status='Published', created_at__gte=tender.created_at).values(*BidSerializer.Meta.fields)
+        bids = [bid async for bid in bids]
+        if not bids:
+            return reason('bids not found', 404)
+
+        return HttpResponse(render_json_array(bids), content_type='application/json')
+
+
+class AsyncBidStatus(AsyncAPIView):
+    async def get(self, request, bidId):
+        username = caller_username(request)
+
+        try:
+            bid = await Bid.objects.only('status', 'version', 'approvements', 'approved', 'organization_id', 'creator_id').aget(id=bidId)
+        except Bid.DoesNotExist:
+            return not_found()
+
+        if bid.status != 'Published':
+            principal = await aget_principal(request, username)
+            if principal is None:
+                return reason(f'user with username {username} does not exist', 401)
+
+            if not check_access_for_bid(bid, principal):
+                return reason('bid is not published, you do not have access because you do not belong to bid organizarion or you are not bid creator', 403)
+
+        return status_response(request, bid)
+
+    async def put(self, request, bidId):
+        return await sync_to_async(BidStatus.as_view())(request, bidId=bidId)
+
+
+class AsyncChangeStream(AsyncAPIView):
+    # Under ASGI a waiting subscriber costs a queue on the event loop instead of a worker thread.
+    async def get(self, request):
+        username = caller_username(request)
+        tender_ids = parse_watched_ids(request.GET.get('tenders'))
+        bid_ids = parse_watched_ids(request.GET.get('bids'))
+
+        if tender_ids is None or bid_ids is None or not (tender_ids or bid_ids) or len(tender_ids) + len(bid_ids) > MAX_WATCHED_IDS:
+            return reason(f'provide tenders and/or bids: comma-separated ids, {MAX_WATCHED_IDS} in total maximum', 400)
+
+        principal = None
+        if username:
+            principal = await aget_principal(request, username)
+            if principal is None:
+                return reason(f'user with username {username} does not exist', 401)
+
+        # Starting the listener waits for its LISTEN, which must not block the event loop.
+        await sync_to_async(change_stream.ensure_listener, thread_sensitive=False)()
+        subscription = change_stream.broker.subscribe(change_stream.AsyncSubscription(watched_keys(tender_ids, bid_ids)))
+        snapshot = await sync_to_async(change_snapshot)(tender_ids, bid_ids, principal)
+        if snapshot is None:
+            change_stream.broker.unsubscribe(subscription)
+            return reason('some of the objects are not published and you do not have access to them', 403)
+
+        return event_stream_response(change_stream.astream(subscription, snapshot, settings.CHANGE_STREAM_TIMEOUT))
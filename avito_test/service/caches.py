@@ -0,0 +1,9 @@
+from django.conf import settings
+
+# Cache backends that live in the process: every process holds its own copy, so nothing written
+# to them by one web worker or the job worker is seen by the others.
+PROCESS_LOCAL_CACHES = {'django.core.cache.backends.locmem.LocMemCache'}
+
+
+def process_local(alias='default'):
+    return settings.CACHES[alias]['BACKEND'] in PROCESS_LOCAL_CACHES
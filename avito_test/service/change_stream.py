@@ -0,0 +1,213 @@
+import asyncio
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from service.metrics import registry
+
+CHANNEL = 'service_changes'
+NOTIFY_BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+# Status and version changes of tenders and bids, fanned out to change stream subscribers.
+# On PostgreSQL every write NOTIFYs a channel and each process LISTENs to it on one dedicated
+# connection, so subscribers of every worker see every change. Elsewhere changes reach only
+# the subscribers of the process that made them.
+
+
+def event(kind, obj):
+    return {'type': kind, 'id': str(obj.id), 'status': obj.status, 'version': obj.version}
+
+
+class Subscription:
+    def __init__(self, keys):
+        self.keys = keys
+        self.queue = queue.Queue()
+
+    def deliver(self, change):
+        self.queue.put(change)
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    def __init__(self, keys):
+        super().__init__(keys)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def deliver(self, change):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, change)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    def __init__(self):
+        self._subscribers = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscription):
+        with self._lock:
+            for key in subscription.keys:
+                self._subscribers.setdefault(key, set()).add(subscription)
+            self._count += 1
+            registry.set('change_stream_subscribers', {}, self._count)
+        ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for key in subscription.keys:
+                subscribers = self._subscribers.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[key]
+            self._count -= 1
+            registry.set('change_stream_subscribers', {}, self._count)
+
+    def deliver(self, change):
+        with self._lock:
+            subscribers = list(self._subscribers.get((change['type'], change['id']), ()))
+        for subscription in subscribers:
+            subscription.deliver(change)
+
+
+broker = Broker()
+
+
+def listens():
+    return connections[DEFAULT_DB_ALIAS].vendor == 'postgresql'
+
+
+def publish(*changes):
+    if not changes:
+        return
+    registry.inc('change_events_published_total', {}, len(changes))
+    if not listens():
+        def deliver():
+            for change in changes:
+                broker.deliver(change)
+        transaction.on_commit(deliver)
+        return
+
+    # NOTIFY is transactional: inside atomic() the listeners hear about it only after the commit.
+    payloads = [json.dumps(change, separators=(',', ':')) for change in changes]
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        for start in range(0, len(payloads), NOTIFY_BATCH_SIZE):
+            cursor.execute('SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload',
+                           [CHANNEL, payloads[start:start + NOTIFY_BATCH_SIZE]])
+
+
+_listener = None
+_listener_lock = threading.Lock()
+_stopping = threading.Event()
+_listening = threading.Event()
+# Seconds between checks whether the listener has to stop while no notification arrives.
+LISTEN_POLL_INTERVAL = 1
+LISTEN_READY_TIMEOUT = 5
+
+
+def ensure_listener():
+    global _listener
+    if not listens() or (_listener is not None and _listener.is_alive()):
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=listen, name='change-listener', daemon=True)
+            _listener.start()
+            # The first subscriber would miss changes committed between its snapshot and LISTEN.
+            if not _listening.wait(LISTEN_READY_TIMEOUT):
+                logger.warning('change listener is not listening after %ss', LISTEN_READY_TIMEOUT)
+
+
+def stop_listener():
+    # Closes the listener's connection, e.g. before the test runner drops the database.
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _stopping.set()
+        _listener.join()
+        _stopping.clear()
+        _listener = None
+
+
+def listen():
+    # A connection of its own, outside Django's per-request handling and the pool: it stays open
+    # for the life of the process, and reconnects after errors.
+    wrapper = connections[DEFAULT_DB_ALIAS]
+    while not _stopping.is_set():
+        try:
+            connection = wrapper.Database.connect(**wrapper.get_connection_params())
+            try:
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                _listening.set()
+                while not _stopping.is_set():
+                    if select.select([connection], [], [], LISTEN_POLL_INTERVAL) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        broker.deliver(json.loads(connection.notifies.pop(0).payload))
+            finally:
+                _listening.clear()
+                connection.close()
+        except Exception:
+            logger.exception('change listener failed, reconnecting')
+            time.sleep(1)
+
+
+def encode(change):
+    return f'data: {json.dumps(change, separators=(",", ":"))}\n\n'.encode()
+
+
+# Clients reconnect after the server ends a stream; EventSource waits `retry` milliseconds first.
+STREAM_PREAMBLE = b'retry: 1000\n\n'
+KEEPALIVE = b': keepalive\n\n'
+KEEPALIVE_INTERVAL = 15
+
+
+def stream(subscription, snapshot, duration):
+    # A stream lasts `duration` seconds at most, so a worker thread is never held indefinitely by a
+    # client that went away without the server noticing. Keepalives make such writes fail sooner.
+    try:
+        yield STREAM_PREAMBLE
+        for change in snapshot:
+            yield encode(change)
+        deadline = time.monotonic() + duration
+        while (remaining := deadline - time.monotonic()) > 0:
+            change = subscription.get(min(remaining, KEEPALIVE_INTERVAL))
+            yield KEEPALIVE if change is None else encode(change)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def astream(subscription, snapshot, duration):
+    try:
+        yield STREAM_PREAMBLE
+        for change in snapshot:
+            yield encode(change)
+        deadline = time.monotonic() + duration
+        while (remaining := deadline - time.monotonic()) > 0:
+            change = await subscription.get(min(remaining, KEEPALIVE_INTERVAL))
+            yield KEEPALIVE if change is None else encode(change)
+    finally:
+        broker.unsubscribe(subscription)
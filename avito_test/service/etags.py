@@ -0,0 +1,60 @@
+from django.db import transaction
+
+# Only edits and rollbacks bump `version`. Status changes and bid decisions (approvements, approved)
+# change the row without it, so the tag carries every such field to stay a strong validator.
+VALIDATED_FIELDS = {
+    'tender': ['version', 'status'],
+    'bid': ['version', 'status', 'approvements', 'approved'],
+}
+
+
+def validated_fields(obj):
+    return VALIDATED_FIELDS[obj._meta.model_name]
+
+
+def make_etag(obj):
+    return '"' + '-'.join(str(getattr(obj, field)) for field in validated_fields(obj)) + '"'
+
+
+def parse_etags(header):
+    return [tag.strip().removeprefix('W/') for tag in header.split(',')]
+
+
+def if_match_failed(request, obj):
+    header = request.headers.get('If-Match')
+    if not header or header.strip() == '*':
+        return False
+    return make_etag(obj) not in parse_etags(header)
+
+
+def if_none_match(request, obj):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    return header.strip() == '*' or make_etag(obj) in parse_etags(header)
+
+
+def with_etag(response, obj):
+    response['ETag'] = make_etag(obj)
+    return response
+
+
+def update_if_unchanged(obj, **changes):
+    # UPDATE ... WHERE version = n AND status = s ...: a concurrent write in between makes it match no rows.
+    unchanged = {field: getattr(obj, field) for field in validated_fields(obj)}
+    updated = type(obj).objects.filter(id=obj.id, **unchanged).update(**changes)
+    return updated == 1
+
+
+def save_new_version(obj, versions, **changes):
+    # Snapshots the state that was read and moves the row to the next version in one transaction,
+    # unless someone else changed it first.
+    with transaction.atomic():
+        if not update_if_unchanged(obj, version=obj.version + 1, **changes):
+            return False
+        versions.save(obj)
+
+    for field, value in changes.items():
+        setattr(obj, field, value)
+    obj.version += 1
+    return True
@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import json
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from service.routing import use_primary
+
+GENERATION_KEY = 'tender-feed:generation'
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+_ainflight = {}
+
+# Cached pages are keyed by a generation: every tender write replaces it, which makes all
+# previously cached pages unreachable at once without having to know their keys.
+#
+# Invalidation only reaches processes that share the cache, so every web worker and the job
+# worker need the same CACHE_BACKEND: Redis, Memcached, the database or file-based cache.
+# The default local-memory cache is only fit for a single process. Single flight below also
+# works within one process only; concurrent misses in different processes each render the page.
+
+
+def invalidate():
+    # A fresh random generation rather than incr(): backends such as FileBasedCache increment by
+    # read-modify-write, so two concurrent writers could both land on the same next value, and a
+    # page rendered between their writes would stay reachable after the second one.
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def page_key(generation, service_types, limit, cursor):
+    params = json.dumps([sorted(set(service_types)), limit, cursor or ''])
+    return f'tender-feed:{generation}:{hashlib.md5(params.encode()).hexdigest()}'
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # A random start keeps keys of an evicted generation from being reused.
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+async def aget_generation():
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+        generation = await cache.aget(GENERATION_KEY)
+    return generation
+
+
+def get_or_render(service_types, limit, cursor, render):
+    key = page_key(get_generation(), service_types, limit, cursor)
+    page = cache.get(key)
+    if page is not None:
+        return page
+
+    # Single flight: concurrent misses on the same page wait for one render instead of each querying.
+    with _inflight_lock:
+        lock = _inflight.setdefault(key, threading.Lock())
+    try:
+        with lock:
+            page = cache.get(key)
+            if page is None:
+                # Rendered from a lagging replica, a page would outlive the invalidation by the write.
+                with use_primary():
+                    page = render()
+                cache.set(key, page, settings.TENDER_FEED_CACHE_TIMEOUT)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+    return page
+
+
+async def aget_or_render(service_types, limit, cursor, render):
+    key = page_key(await aget_generation(), service_types, limit, cursor)
+    page = await cache.aget(key)
+    if page is not None:
+        return page
+
+    task = _ainflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_arender(key, render))
+        _ainflight[key] = task
+        task.add_done_callback(lambda _: _ainflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def _arender(key, render):
+    with use_primary():
+        page = await render()
+    await cache.aset(key, page, settings.TENDER_FEED_CACHE_TIMEOUT)
+    return page
@@ -0,0 +1,140 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from service import change_stream, feed_cache
+from service.models import Job, Tender, Bid
+
+AUTO_CLOSE = 'close_expired_tenders'
+
+logger = logging.getLogger(__name__)
+
+# Background jobs are rows of the Job table. A worker claims the oldest due job with
+# SELECT ... FOR UPDATE SKIP LOCKED and marks it running under a lease in the same transaction,
+# so concurrent workers never pick the same job and never wait for each other. A job whose
+# worker died becomes due again when its lease expires; a failing job is retried with backoff.
+
+handlers = {}
+
+
+def handler(kind):
+    def register(function):
+        handlers[kind] = function
+        return function
+    return register
+
+
+def enqueue(kind, payload=None, run_at=None, key=None):
+    # Returns None when a job with the same key is already queued or running.
+    try:
+        with transaction.atomic():
+            return Job.objects.create(kind=kind, payload=payload or {}, run_at=run_at or timezone.now(), key=key)
+    except IntegrityError:
+        if key is None:
+            raise
+        return None
+
+
+def due(now):
+    return Q(status='Queued', run_at__lte=now) | Q(status='Running', locked_until__lt=now)
+
+
+def claim(worker):
+    now = timezone.now()
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(due(now)).order_by('run_at', 'id').first()
+        if job is None:
+            return None
+        # Backends without row locks (SQLite) rely on this conditional update alone.
+        claimed = Job.objects.filter(id=job.id, status=job.status, locked_until=job.locked_until).update(
+            status='Running', locked_by=worker, locked_until=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+            attempts=job.attempts + 1,
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def heartbeat(job):
+    # Long jobs call this between batches to keep their lease.
+    Job.objects.filter(id=job.id, locked_by=job.locked_by, status='Running') \
+        .update(locked_until=timezone.now() + timedelta(seconds=settings.JOB_LEASE_SECONDS))
+
+
+def run(job):
+    ours = Job.objects.filter(id=job.id, locked_by=job.locked_by, status='Running')
+    try:
+        handlers[job.kind](job)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('job %s (%s) failed', job.id, job.kind)
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            # A recurring job that gave up still has its next occurrence.
+            with transaction.atomic():
+                ours.update(status='Failed', error=error, locked_until=None, finished_at=timezone.now())
+                schedule_next(job.kind)
+        else:
+            retry_at = timezone.now() + timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1))
+            ours.update(status='Queued', error=error, locked_until=None, run_at=retry_at)
+        return False
+
+    with transaction.atomic():
+        ours.update(status='Done', locked_until=None, finished_at=timezone.now())
+        schedule_next(job.kind)
+    return True
+
+
+def schedule_next(kind, run_at=None):
+    # Recurring jobs keep one queued instance, keyed by their kind.
+    if kind == AUTO_CLOSE and settings.TENDER_AUTO_CLOSE_DAYS:
+        run_at = run_at or timezone.now() + timedelta(seconds=settings.TENDER_AUTO_CLOSE_INTERVAL)
+        return enqueue(AUTO_CLOSE, run_at=run_at, key=AUTO_CLOSE)
+    return None
+
+
+@handler(AUTO_CLOSE)
+def close_expired_tenders(job):
+    # Published tenders older than TENDER_AUTO_CLOSE_DAYS (or payload['days']) are closed and
+    # their bids still waiting for a decision are cancelled, one batch per transaction. A tender
+    # is only closed together with all of its pending bids: when the tender or one of those bids
+    # is locked by a concurrent writer, the tender stays published and is closed by the next run.
+    days = job.payload.get('days', settings.TENDER_AUTO_CLOSE_DAYS)
+    batch_size = job.payload.get('batch_size', settings.TENDER_AUTO_CLOSE_BATCH_SIZE)
+    cutoff = timezone.now() - timedelta(days=days)
+    closed = cancelled = 0
+    postponed = set()
+    while True:
+        with transaction.atomic():
+            tenders = list(
+                Tender.objects.select_for_update(skip_locked=True)
+                .filter(status='Published', created_at__lt=cutoff).exclude(id__in=postponed)
+                .order_by('created_at', 'id').values_list('id', 'version')[:batch_size]
+            )
+            if not tenders:
+                break
+            pending = Bid.objects.filter(tender_id__in=[tender_id for tender_id, _ in tenders], approved__isnull=True) \
+                .exclude(status='Cancelled')
+            bids = list(pending.select_for_update(skip_locked=True).values_list('id', 'version', 'tender_id'))
+            skipped = set(pending.exclude(id__in=[bid_id for bid_id, _, _ in bids]).values_list('tender_id', flat=True))
+            postponed |= skipped
+            tenders = [(tender_id, version) for tender_id, version in tenders if tender_id not in skipped]
+            bids = [(bid_id, version) for bid_id, version, tender_id in bids if tender_id not in skipped]
+            tender_ids = [tender_id for tender_id, _ in tenders]
+            Tender.objects.filter(id__in=tender_ids).update(status='Closed')
+            Bid.objects.filter(id__in=[bid_id for bid_id, _ in bids]).update(status='Cancelled')
+            change_stream.publish(
+                *[{'type': 'tender', 'id': str(tender_id), 'status': 'Closed', 'version': version} for tender_id, version in tenders],
+                *[{'type': 'bid', 'id': str(bid_id), 'status': 'Cancelled', 'version': version} for bid_id, version in bids],
+            )
+        closed += len(tenders)
+        cancelled += len(bids)
+        feed_cache.invalidate()
+        heartbeat(job)
+    logger.info('auto-close: closed %d tenders, cancelled %d bids, postponed %d tenders with locked bids',
+                closed, cancelled, len(postponed))
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from service.archive import SegmentWriter, archive_owners, owners_to_archive
+from service.views import chunked
+from service.versions import tender_versions, bid_versions
+
+
+class Command(BaseCommand):
+    help = 'Move old tender and bid versions out of the version tables into compressed segment files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, help='archive versions created more than this many days ago')
+        parser.add_argument('--keep-last', type=int, help='always keep this many latest versions of every tender and bid')
+        parser.add_argument('--batch-size', type=int, default=500, help='owners archived per transaction')
+
+    def handle(self, *args, **options):
+        if not settings.VERSION_ARCHIVE_DIR:
+            raise CommandError('set VERSION_ARCHIVE_DIR to a directory on persistent storage')
+        keep_last = options['keep_last']
+        days = options['older_than_days']
+        if keep_last is None and days is None:
+            raise CommandError('provide --older-than-days and/or --keep-last')
+        if keep_last is not None and keep_last < 0:
+            raise CommandError('--keep-last must not be negative')
+        before = timezone.now() - timedelta(days=days) if days is not None else None
+
+        for store in (tender_versions, bid_versions):
+            kind = store.model._meta.model_name
+            owners = owners_to_archive(store, keep_last, before)
+            writer = SegmentWriter(kind)
+            archived = rebased = 0
+            try:
+                for batch in chunked(owners, options['batch_size']):
+                    batch_archived, batch_rebased = archive_owners(store, batch, keep_last, before, writer)
+                    archived += batch_archived
+                    rebased += batch_rebased
+            finally:
+                writer.close()
+            self.stdout.write(f'{kind}: archived {archived} versions of {len(owners)} owners, re-keyed {rebased} remaining rows')
@@ -0,0 +1,187 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.test import Client
+
+from service.metrics import QueryCounter
+from service.models import Tender, Bid, OrganizationResponsible, TenderVersion, BidVersion, Feedback
+
+# Streams stay open for CHANGE_STREAM_TIMEOUT; their requests are timed up to the first event and then closed.
+STREAMS = {'changes-stream'}
+
+
+class Command(BaseCommand):
+    help = 'Drive every API endpoint and report latency percentiles, throughput and queries per request as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='requests per endpoint')
+        parser.add_argument('--only', nargs='*', help='URL names to run, all by default')
+        parser.add_argument('--server', help='base URL of a running server, e.g. http://127.0.0.1:8080; '
+                                             'the in-process test client is used by default')
+        parser.add_argument('--output', help='write the JSON report to this file')
+        parser.add_argument('--baseline', help='JSON report of an earlier run; p50 and p95 are compared with it on stderr')
+
+    def handle(self, *args, **options):
+        scenarios = self.scenarios()
+        if options['only']:
+            scenarios = [scenario for scenario in scenarios if scenario[0].split('[')[0] in options['only']]
+
+        if options['server']:
+            send = self.server_sender(options['server'].rstrip('/'))
+        else:
+            send = self.client_sender()
+
+        report = {'requests': options['requests'], 'server': options['server'], 'endpoints': {}}
+        for name, method, path, body in scenarios:
+            report['endpoints'][f'{method} {name}'] = self.run(send, method, path, body, options['requests'], name in STREAMS)
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        self.stdout.write(output)
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                self.compare(json.load(file), report)
+
+    def compare(self, baseline, report):
+        self.stderr.write(f'{"endpoint":<40} {"p50 before":>10} {"p50 after":>10} {"p95 before":>10} {"p95 after":>10}')
+        for name, result in report['endpoints'].items():
+            before = baseline['endpoints'].get(name)
+            if before is None:
+                continue
+            self.stderr.write(
+                f'{name:<40} {before["p50_ms"]:>10.3f} {result["p50_ms"]:>10.3f} {before["p95_ms"]:>10.3f} {result["p95_ms"]:>10.3f}'
+            )
+
+    def run(self, send, method, path, body, total, stream=False):
+        latencies = []
+        queries = []
+        codes = {}
+        started = time.perf_counter()
+        for _ in range(total):
+            request_started = time.perf_counter()
+            code, query_count = send(method, path, body, stream)
+            latencies.append((time.perf_counter() - request_started) * 1000)
+            if query_count is not None:
+                queries.append(query_count)
+            codes[str(code)] = codes.get(str(code), 0) + 1
+        elapsed = time.perf_counter() - started
+
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        return {
+            'p50_ms': round(percentiles[49], 3),
+            'p95_ms': round(percentiles[94], 3),
+            'p99_ms': round(percentiles[98], 3),
+            'throughput_rps': round(total / elapsed, 1),
+            'queries_per_request': round(statistics.mean(queries), 2) if queries else None,
+            'status_codes': codes,
+        }
+
+    def client_sender(self):
+        from django.db import connection
+
+        client = Client(HTTP_HOST='localhost', HTTP_ACCEPT='application/json', raise_request_exception=False)
+
+        def send(method, path, body, stream):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                response = getattr(client, method.lower())(path, body, content_type='application/json') if body is not None \
+                    else getattr(client, method.lower())(path)
+                if response.streaming and stream:
+                    for chunk in response.streaming_content:
+                        if chunk.startswith(b'data:'):
+                            break
+                    response.close()
+                elif response.streaming:
+                    b''.join(response.streaming_content)
+            return response.status_code, counter.queries
+        return send
+
+    def server_sender(self, base_url):
+        def send(method, path, body, stream):
+            data = json.dumps(body).encode() if body is not None else None
+            request = urllib.request.Request(base_url + path, data=data, method=method,
+                                             headers={'Content-Type': 'application/json', 'Accept': 'application/json'})
+            try:
+                with urllib.request.urlopen(request) as response:
+                    if stream:
+                        while (line := response.readline()) and not line.startswith(b'data:'):
+                            pass
+                    else:
+                        response.read()
+                    return response.status, None
+            except urllib.error.HTTPError as error:
+                return error.code, None
+        return send
+
+    def scenarios(self):
+        bid = Bid.objects.select_related('tender').filter(status='Published', tender__status='Published').first()
+        if bid is None:
+            raise CommandError('no published bids of published tenders found, run seed_bench first')
+
+        tender = bid.tender
+        responsible = OrganizationResponsible.objects.select_related('user_id', 'organization_id') \
+            .filter(organization_id=tender.organization_id).first()
+        if responsible is None:
+            raise CommandError(f'tender {tender.id} organization has no responsible employees')
+        username = responsible.user_id.username
+        bid_owner = Bid.objects.filter(Q(organization=tender.organization_id) | Q(creator=responsible.user_id)).first() or bid
+        approved_bid = Bid.objects.filter(tender__organization=tender.organization_id, approved=True).first() or bid
+        author = Feedback.objects.select_related('executor').filter(bid__tender=tender).first()
+        author_username = author.executor.username if author else bid.creator.username
+        tender_version = TenderVersion.objects.filter(tender=tender).values_list('version', flat=True).first() or 1
+        bid_version = BidVersion.objects.filter(bid=bid_owner).values_list('version', flat=True).first() or 1
+        tender_ids = list(Tender.objects.filter(organization=tender.organization_id).values_list('id', flat=True)[:100])
+        owned_bid_ids = list(Bid.objects.filter(Q(organization=tender.organization_id) | Q(creator=responsible.user_id))
+                             .values_list('id', flat=True)[:100]) or [bid.id]
+
+        def query(**params):
+            return '?' + urlencode(params, doseq=True)
+
+        return [
+            ('ping', 'GET', '/api/ping/', None),
+            ('auth-token', 'POST', '/api/auth/token/' + query(username=username), None),
+            ('tenders', 'GET', '/api/tenders/' + query(limit=50), None),
+            ('tenders[serviceType]', 'GET', '/api/tenders/' + query(**{'limit': 50, 'serviceType[]': tender.service_type}), None),
+            ('tenders-search', 'GET', '/api/tenders/search/' + query(q=tender.name.split()[0], limit=50), None),
+            ('tenders-new', 'POST', '/api/tenders/new/', {
+                'name': 'bench', 'description': 'bench', 'serviceType': tender.service_type,
+                'organizationId': str(tender.organization_id), 'creatorUsername': username,
+            }),
+            ('tenders-my', 'GET', '/api/tenders/my/' + query(username=username), None),
+            ('tenders-bulk-status', 'PUT', '/api/tenders/bulk-status/' + query(username=username, status='Published'),
+             {'ids': [str(tender_id) for tender_id in tender_ids]}),
+            ('tender-status', 'GET', f'/api/tenders/{tender.id}/status/' + query(username=username), None),
+            ('tender-status', 'PUT', f'/api/tenders/{tender.id}/status/' + query(username=username, status='Published'), None),
+            ('tender-edit', 'PATCH', f'/api/tenders/{tender.id}/edit/' + query(username=username), {'description': 'bench edit'}),
+            ('tender-rollback', 'PUT', f'/api/tenders/{tender.id}/rollback/{tender_version}/' + query(username=username), None),
+            ('bid-new', 'POST', '/api/bids/new/', {
+                'name': 'bench', 'description': 'bench', 'tenderId': str(tender.id),
+                'authorType': 'User', 'authorId': str(bid.creator_id),
+            }),
+            ('bid-my', 'GET', '/api/bids/my/' + query(username=username), None),
+            ('bid-list', 'GET', f'/api/bids/{tender.id}/list/' + query(username=username), None),
+            ('bid-status', 'GET', f'/api/bids/{bid.id}/status/' + query(username=username), None),
+            ('statuses', 'POST', '/api/statuses/' + query(username=username), {
+                'tenders': [str(tender_id) for tender_id in tender_ids],
+                'bids': [str(bid_id) for bid_id in Bid.objects.filter(tender=tender).values_list('id', flat=True)[:100]],
+            }),
+            ('bid-status', 'PUT', f'/api/bids/{bid_owner.id}/status/' + query(username=username, status='Published'), None),
+            ('bids-bulk-status', 'PUT', '/api/bids/bulk-status/' + query(username=username, status='Published'),
+             {'ids': [str(bid_id) for bid_id in owned_bid_ids]}),
+            ('bid-edit', 'PATCH', f'/api/bids/{bid_owner.id}/edit/' + query(username=username), {'description': 'bench edit'}),
+            ('bid-rollback', 'PUT', f'/api/bids/{bid_owner.id}/rollback/{bid_version}/' + query(username=username), None),
+            ('bid-submit', 'PUT', f'/api/bids/{bid.id}/submit-decision/' + query(username=username, decision='Approved'), None),
+            ('bid-feedback', 'PUT', f'/api/bids/{approved_bid.id}/feedback/' + query(username=username, bidFeedback='bench'), None),
+            ('get-feedback', 'GET', f'/api/bids/{tender.id}/reviews/' + query(authorUsername=author_username, requesterUsername=username), None),
+            ('changes-stream', 'GET', '/api/changes/stream/' + query(
+                username=username, tenders=','.join(str(tender_id) for tender_id in tender_ids[:10]), bids=str(bid.id)), None),
+            ('metrics', 'GET', '/api/metrics', None),
+        ]
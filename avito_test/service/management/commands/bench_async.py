@@ -0,0 +1,88 @@
+import asyncio
+import json
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, AsyncClient
+from django.test.utils import override_settings
+
+from avito_test.urls import sync_urlpatterns, async_urlpatterns
+from service.models import Bid, OrganizationResponsible
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent-request throughput of the hot read endpoints on the WSGI and ASGI paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=20)
+
+    def handle(self, *args, **options):
+        paths = self.build_paths()
+        total = options['requests']
+        concurrency = options['concurrency']
+
+        results = {}
+        for name, path in paths.items():
+            results[name] = {
+                'wsgi_rps': self.run_sync(path, total, concurrency),
+                'asgi_rps': self.run_async(path, total, concurrency),
+            }
+        self.stdout.write(json.dumps({'requests': total, 'concurrency': concurrency, 'endpoints': results}, indent=2))
+
+    def build_paths(self):
+        bid = Bid.objects.select_related('tender').filter(status='Published').first()
+        if bid is None:
+            raise CommandError('no published bids found, seed the database first')
+
+        tender = bid.tender
+        responsible = OrganizationResponsible.objects.select_related('user_id').filter(organization_id=tender.organization_id).first()
+        if responsible is None:
+            raise CommandError(f'tender {tender.id} organization has no responsible employees')
+        username = responsible.user_id.username
+
+        return {
+            'tenders': '/api/tenders/?limit=50',
+            'tender-status': f'/api/tenders/{tender.id}/status/?username={username}',
+            'bid-status': f'/api/bids/{bid.id}/status/?username={username}',
+            'bid-list': f'/api/bids/{tender.id}/list/?username={username}',
+            'bid-my': f'/api/bids/my/?username={username}',
+        }
+
+    def run_sync(self, path, total, concurrency):
+        def worker(count):
+            client = Client(HTTP_HOST='localhost', HTTP_ACCEPT='application/json')
+            for _ in range(count):
+                client.get(path)
+            connections.close_all()
+
+        with override_settings(ROOT_URLCONF=self.urlconf(sync_urlpatterns)):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as executor:
+                list(executor.map(worker, self.split(total, concurrency)))
+            return round(total / (time.perf_counter() - started), 1)
+
+    def run_async(self, path, total, concurrency):
+        async def worker(count):
+            client = AsyncClient(HTTP_HOST='localhost', HTTP_ACCEPT='application/json')
+            for _ in range(count):
+                await client.get(path)
+
+        async def run():
+            await asyncio.gather(*(worker(count) for count in self.split(total, concurrency)))
+
+        with override_settings(ROOT_URLCONF=self.urlconf(async_urlpatterns)):
+            started = time.perf_counter()
+            asyncio.run(run())
+            return round(total / (time.perf_counter() - started), 1)
+
+    def urlconf(self, patterns):
+        module = types.ModuleType('bench_urls')
+        module.urlpatterns = patterns
+        return module
+
+    def split(self, total, parts):
+        return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
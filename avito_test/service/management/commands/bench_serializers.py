@@ -0,0 +1,72 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from service import streaming
+from service.models import Tender, Bid, Feedback
+from service.serializers import TenderSerializer, BidSerializer, FeedbackSerializer
+
+# Text that exercises escaping: quotes, backslashes, control characters, non-ASCII and the JS line separators.
+SAMPLES = ['plain', 'quote " and \\ backslash', 'tab\tnew\nline\x01', 'кириллица', 'emoji \U0001f600', 'js    ', '']
+
+
+def text(rnd):
+    return ' '.join(rnd.choice(SAMPLES) for _ in range(rnd.randint(1, 8)))
+
+
+def make_rows(model, fields, count, rnd):
+    now = timezone.now()
+    values = {
+        'id': lambda: uuid.UUID(int=rnd.getrandbits(128)),
+        'name': lambda: text(rnd),
+        'description': lambda: text(rnd),
+        'status': lambda: rnd.choice(['Created', 'Published', 'Closed']),
+        'service_type': lambda: rnd.choice(['Construction', 'Delivery', 'Manufacture']),
+        'version': lambda: rnd.randint(1, 100),
+        'created_at': lambda: now - timedelta(seconds=rnd.uniform(0, 10 ** 7)),
+    }
+    rows = [{field: values[field]() for field in fields} for _ in range(count)]
+    return rows, [model(**row) for row in rows]
+
+
+def measure(render, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = render()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return body, best
+
+
+class Command(BaseCommand):
+    help = 'Compare rows per second of the DRF serializers and the .values() fast path, and check the output is identical'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        count = options['rows']
+        renderer = JSONRenderer()
+        encoder = 'orjson' if streaming.orjson is not None else 'json'
+
+        self.stdout.write(f'{"shape":<10} {"drf rows/s":>12} {"fast rows/s":>12} {"speedup":>8}  ({encoder}, {count} rows)')
+        for model, serializer_class in ((Tender, TenderSerializer), (Bid, BidSerializer), (Feedback, FeedbackSerializer)):
+            rows, instances = make_rows(model, serializer_class.Meta.fields, count, rnd)
+
+            expected, drf_time = measure(lambda: renderer.render(serializer_class(instances, many=True).data), options['repeat'])
+            body, fast_time = measure(lambda: streaming.render_json_array(rows), options['repeat'])
+            if body != expected:
+                raise CommandError(f'{model.__name__}: fast path output differs from {serializer_class.__name__}')
+
+            self.stdout.write(
+                f'{model.__name__:<10} {count / drf_time:>12.0f} {count / fast_time:>12.0f} {drf_time / fast_time:>7.1f}x'
+            )
@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from service import partitioning
+
+
+class Command(BaseCommand):
+    help = 'Create the monthly tender and bid partitions ahead of time; converts tables that are not partitioned yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=settings.PARTITION_MONTHS_AHEAD,
+                            help='create partitions up to this many months after the current one')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('tables can only be partitioned on PostgreSQL')
+        if not settings.PARTITION_TABLES:
+            raise CommandError('set PARTITION_TABLES to partition tenders and bids')
+        if options['months_ahead'] < 0:
+            raise CommandError('--months-ahead must not be negative')
+
+        for table in partitioning.TABLES:
+            with transaction.atomic(), connection.cursor() as cursor:
+                try:
+                    converted = partitioning.convert(cursor, table, options['months_ahead'], settings.PARTITION_DROP_FOREIGN_KEYS)
+                except partitioning.ForeignKeysExist as error:
+                    raise CommandError(str(error))
+                if converted:
+                    self.stdout.write(f'{table}: converted to a partitioned table')
+                created = partitioning.create_partitions(cursor, table, datetime.now(timezone.utc), options['months_ahead'])
+                cursor.execute(f'SELECT count(*) FROM {table}_default')
+                outside = cursor.fetchone()[0]
+            self.stdout.write(f'{table}: created {len(created)} partitions{": " + ", ".join(created) if created else ""}')
+            if outside:
+                self.stderr.write(f'{table}: {outside} rows are in the default partition, run this command more often')
@@ -0,0 +1,77 @@
+import logging
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from service import jobs
+from service.caches import process_local
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the job table; any number of workers can run side by side'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='jobs run at the same time by this worker')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds to wait when no job is due')
+        parser.add_argument('--burst', action='store_true', help='exit once no job is due instead of waiting for more')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+        # Jobs change tenders in the feed; the cached pages of the web workers are only invalidated
+        # through a cache they share with this process.
+        if process_local():
+            raise CommandError('the worker needs the CACHE_BACKEND of the web workers, the default one is per process')
+
+        stop = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+
+        if jobs.schedule_next(jobs.AUTO_CLOSE, run_at=timezone.now()):
+            self.stdout.write('scheduled tender auto-close')
+
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        threads = [
+            threading.Thread(target=self.work, args=(f'{name}:{number}', stop, options), daemon=True)
+            for number in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f'worker {name} running {len(threads)} jobs at a time')
+        # Joined with a timeout so the signal handlers get to run.
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(0.5)
+        connections.close_all()
+
+    def work(self, name, stop, options):
+        done = failed = 0
+        try:
+            while not stop.is_set():
+                try:
+                    job = jobs.claim(name)
+                except DatabaseError:
+                    # Lost connection or, on SQLite, a busy database: try again after a pause.
+                    logger.exception('%s: could not claim a job', name)
+                    connections.close_all()
+                    stop.wait(options['poll_interval'])
+                    continue
+                if job is None:
+                    if options['burst']:
+                        break
+                    stop.wait(options['poll_interval'])
+                    continue
+                if jobs.run(job):
+                    done += 1
+                else:
+                    failed += 1
+        finally:
+            connections.close_all()
+        self.stdout.write(f'{name}: {done} jobs done, {failed} failed')
@@ -0,0 +1,146 @@
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from service.models import Employee, Organization, OrganizationResponsible, Tender, TenderVersion, Bid, BidVersion, \
+    Feedback
+
+SERVICE_TYPES = ['Construction', 'Delivery', 'Manufacture']
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    # bulk_create would stamp every row with now(); seeded rows are spread over the past instead.
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Generate benchmark data: employees, organizations, responsibles, tenders, versions, bids and feedback'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=1000)
+        parser.add_argument('--organizations', type=int, default=100)
+        parser.add_argument('--responsibles-per-organization', type=int, default=5)
+        parser.add_argument('--tenders', type=int, default=10000)
+        parser.add_argument('--versions-per-tender', type=int, default=3)
+        parser.add_argument('--bids-per-tender', type=int, default=5)
+        parser.add_argument('--feedback', type=int, default=2000)
+        parser.add_argument('--days', type=int, default=365, help='spread created_at over this many past days')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        run = uuid.uuid4().hex[:6]
+        now = timezone.now()
+        span = timedelta(days=options['days']).total_seconds()
+        started = time.perf_counter()
+
+        def created_at():
+            return now - timedelta(seconds=rnd.uniform(0, span))
+
+        def insert(model, objects):
+            model.objects.bulk_create(objects, batch_size=batch_size)
+            self.stdout.write(f'{model.__name__}: {len(objects)}')
+            return objects
+
+        with transaction.atomic(), explicit_timestamps(Tender, Bid, Feedback):
+            employees = insert(Employee, [
+                Employee(id=uuid.uuid4(), username=f'bench-{run}-{i}', first_name='Bench', last_name=str(i))
+                for i in range(options['employees'])
+            ])
+            organizations = insert(Organization, [
+                Organization(id=uuid.uuid4(), name=f'bench-{run}-{i}', type=rnd.choice(['IE', 'LLC', 'JSC']))
+                for i in range(options['organizations'])
+            ])
+
+            members = {}
+            responsibles = []
+            per_organization = min(options['responsibles_per_organization'], len(employees))
+            for organization in organizations:
+                members[organization.id] = rnd.sample(employees, per_organization)
+                responsibles += [
+                    OrganizationResponsible(organization_id=organization, user_id=employee)
+                    for employee in members[organization.id]
+                ]
+            insert(OrganizationResponsible, responsibles)
+
+            # bulk_create skips the signals that maintain responsible_count.
+            counts = OrganizationResponsible.objects.filter(organization_id=OuterRef('pk')).values('organization_id') \
+                .annotate(total=Count('id')).values('total')
+            Organization.objects.filter(id__in=[organization.id for organization in organizations]) \
+                .update(responsible_count=Coalesce(Subquery(counts), 0))
+
+            tenders = []
+            tender_versions = []
+            for i in range(options['tenders']):
+                organization = rnd.choice(organizations)
+                versions = rnd.randint(1, options['versions_per_tender'])
+                tender = Tender(
+                    id=uuid.uuid4(), name=f'tender {i}', description=f'bench tender {i} ' * 10,
+                    service_type=rnd.choice(SERVICE_TYPES), status=rnd.choice(['Created', 'Published', 'Published', 'Closed']),
+                    version=versions, organization=organization, creator=rnd.choice(members[organization.id]),
+                    created_at=created_at(),
+                )
+                tenders.append(tender)
+                tender_versions += [
+                    TenderVersion(tender=tender, name=tender.name, description=f'bench tender {i} revision {version}',
+                                  service_type=tender.service_type, version=version)
+                    for version in range(1, versions)
+                ]
+            insert(Tender, tenders)
+            insert(TenderVersion, tender_versions)
+
+            bids = []
+            bid_versions = []
+            for tender in tenders:
+                for j in range(options['bids_per_tender']):
+                    creator = rnd.choice(employees)
+                    organization = rnd.choice(organizations) if rnd.random() < 0.5 else None
+                    versions = rnd.randint(1, options['versions_per_tender'])
+                    bid = Bid(
+                        id=uuid.uuid4(), name=f'{tender.name} bid {j}', description=f'bench bid {j} ' * 10,
+                        status=rnd.choice(['Created', 'Published', 'Published', 'Cancelled']),
+                        author_type='Organization' if organization else 'User', version=versions,
+                        approved=rnd.choice([None, None, True, False]), creator=creator, organization=organization,
+                        tender=tender, created_at=tender.created_at + timedelta(seconds=rnd.uniform(0, 86400)),
+                    )
+                    bids.append(bid)
+                    bid_versions += [
+                        BidVersion(bid=bid, name=bid.name, description=f'bench bid {j} revision {version}', version=version)
+                        for version in range(1, versions)
+                    ]
+            insert(Bid, bids)
+            insert(BidVersion, bid_versions)
+
+            approved = [bid for bid in bids if bid.approved] or bids
+            insert(Feedback, [
+                Feedback(id=uuid.uuid4(), bid=bid, description=f'feedback {i}', executor=bid.creator,
+                         created_at=bid.created_at + timedelta(days=1))
+                for i, bid in enumerate(rnd.choice(approved) for _ in range(options['feedback'] if bids else 0))
+            ])
+
+            # Nor the ones that maintain the review aggregates.
+            reviews = Feedback.objects.filter(executor=OuterRef('pk')).values('executor')
+            Employee.objects.filter(id__in=[employee.id for employee in employees]).update(
+                review_count=Coalesce(Subquery(reviews.annotate(total=Count('id')).values('total')), 0),
+                last_reviewed_at=Subquery(reviews.annotate(latest=Max('created_at')).values('latest')),
+            )
+
+        self.stdout.write(f'seeded run {run} in {time.perf_counter() - started:.1f}s')
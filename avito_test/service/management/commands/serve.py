@@ -0,0 +1,160 @@
+import os
+import signal
+import socket
+import sys
+import time
+
+from decouple import config
+from django.apps import apps
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.urls import get_resolver
+
+from service import serializers
+from service.caches import process_local
+from service.metrics import registry
+from service.pooling import close_pools
+
+try:
+    import uvicorn
+except ImportError:
+    uvicorn = None
+
+try:
+    import waitress
+except ImportError:
+    waitress = None
+
+# Seconds a stopping ASGI worker waits for open requests; change streams would hold it for CHANGE_STREAM_TIMEOUT.
+SHUTDOWN_TIMEOUT = 10
+
+
+def default_workers():
+    # A worker runs one database-bound request at a time under ASGI (sync code goes through a single
+    # thread) and is held by the GIL under WSGI, so one per CPU. A process-local cache can only serve one.
+    if process_local():
+        return 1
+    return os.cpu_count() or 1
+
+
+def pending_migrations(alias=DEFAULT_DB_ALIAS):
+    # Same check migrate starts with: one query to django_migrations, no autodetector run.
+    executor = MigrationExecutor(connections[alias])
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def warm_up():
+    # With ASYNC_VIEWS the application is the one asgi.py exposes, with the native async views.
+    application = get_asgi_application() if settings.ASYNC_VIEWS else get_wsgi_application()
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict
+    for model in apps.get_models():
+        model._meta.get_fields()
+    for serializer in (serializers.TenderSerializer, serializers.BidSerializer, serializers.FeedbackSerializer):
+        serializer().fields
+    return application
+
+
+class Command(BaseCommand):
+    help = 'Serve the API with pre-forked worker processes, warmed up and with migrations applied before forking. ' \
+           'WSGI through waitress by default, ASGI through uvicorn with ASYNC_VIEWS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--address', default=settings.SERVER_ADDRESS, help='host:port, defaults to SERVER_ADDRESS')
+        parser.add_argument('--workers', type=int, default=config('WEB_WORKERS', default=default_workers(), cast=int),
+                            help='defaults to WEB_WORKERS, or one per CPU with a shared cache')
+        parser.add_argument('--no-migrate', action='store_true', help='fail instead of applying pending migrations')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        host, port = options['address'].rsplit(':', 1)
+        # The feed cache must be shared to be invalidated for every worker; metrics and resolved
+        # principals stay per process (see README).
+        if options['workers'] > 1 and process_local():
+            raise CommandError(f'{options["workers"]} workers need a shared CACHE_BACKEND, the default one is per process; '
+                               f'set CACHE_BACKEND or WEB_WORKERS=1')
+        if settings.ASYNC_VIEWS and uvicorn is None:
+            raise CommandError('ASYNC_VIEWS is set, serving asgi.py needs uvicorn installed')
+        if not settings.ASYNC_VIEWS and waitress is None:
+            raise CommandError('serving wsgi.py needs waitress installed')
+
+        plan = pending_migrations()
+        if plan and options['no_migrate']:
+            raise CommandError(f'{len(plan)} unapplied migrations')
+        if plan:
+            call_command('migrate', interactive=False, verbosity=options['verbosity'])
+        migrated = time.perf_counter()
+
+        application = warm_up()
+        warmed = time.perf_counter()
+
+        listener = socket.create_server((host, int(port)), backlog=1024)
+
+        # Children must open their own database connections, never share the parent's sockets.
+        connections.close_all()
+        close_pools()
+
+        cold_start = time.perf_counter() - started
+        registry.set('process_cold_start_seconds', {}, round(cold_start, 6))
+        self.stdout.write(
+            f'cold start {cold_start:.3f}s (migrations {migrated - started:.3f}s, warm-up {warmed - migrated:.3f}s), '
+            f'serving http://{host}:{port}/ ({"ASGI" if settings.ASYNC_VIEWS else "WSGI"}) with {options["workers"]} workers'
+        )
+        sys.stdout.flush()
+
+        workers = {}
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+            for pid in workers:
+                os.kill(pid, signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        while True:
+            while not stopping and len(workers) < options['workers']:
+                pid = os.fork()
+                if pid == 0:
+                    if settings.ASYNC_VIEWS:
+                        self.run_asgi_worker(listener, application)
+                    self.run_worker(listener, application)
+                workers[pid] = time.monotonic()
+
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            workers.pop(pid, None)
+            if stopping and not workers:
+                break
+            if not stopping:
+                self.stderr.write(f'worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting')
+
+    def run_worker(self, listener, application):
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda signum, frame: os._exit(0))
+        try:
+            waitress.serve(application, sockets=[listener], threads=config('WEB_THREADS', default=4, cast=int),
+                           _quiet=True)
+        finally:
+            os._exit(1)
+
+    def run_asgi_worker(self, listener, application):
+        # uvicorn installs its own SIGTERM/SIGINT handlers and finishes open requests before exiting.
+        try:
+            server = uvicorn.Server(uvicorn.Config(application, lifespan='off', timeout_graceful_shutdown=SHUTDOWN_TIMEOUT))
+            server.run(sockets=[listener])
+            os._exit(0)
+        finally:
+            os._exit(1)
@@ -0,0 +1,174 @@
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpResponse
+
+from service.pooling import pool_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.queries = 0
+        self.db_time = 0.0
+
+
+class Registry:
+    def __init__(self):
+        self._endpoints = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, latency, queries, db_time):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            stats.requests += 1
+            stats.latency_sum += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    stats.latency_buckets[i] += 1
+                    break
+            stats.queries += queries
+            stats.db_time += db_time
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, labels, value):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def render(self):
+        with self._lock:
+            endpoints = {name: vars(stats).copy() for name, stats in self._endpoints.items()}
+            for stats in endpoints.values():
+                stats['latency_buckets'] = list(stats['latency_buckets'])
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        lines = [
+            '# TYPE http_requests_total counter',
+            '# TYPE http_request_duration_seconds histogram',
+            '# TYPE db_queries_total counter',
+            '# TYPE db_query_duration_seconds_total counter',
+        ]
+        for name, stats in sorted(endpoints.items()):
+            label = f'endpoint="{name}"'
+            lines.append(f'http_requests_total{{{label}}} {stats["requests"]}')
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats['latency_buckets']):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{label},le="+Inf"}} {stats["requests"]}')
+            lines.append(f'http_request_duration_seconds_sum{{{label}}} {stats["latency_sum"]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{label}}} {stats["requests"]}')
+            lines.append(f'db_queries_total{{{label}}} {stats["queries"]}')
+            lines.append(f'db_query_duration_seconds_total{{{label}}} {stats["db_time"]:.6f}')
+
+        for alias, stats in sorted(pool_stats().items()):
+            label = f'database="{alias}"'
+            lines.append(f'db_pool_connections{{{label},state="idle"}} {stats["idle"]}')
+            lines.append(f'db_pool_connections{{{label},state="in_use"}} {stats["in_use"]}')
+            lines.append(f'db_pool_max_size{{{label}}} {stats["max_size"]}')
+            lines.append(f'db_pool_utilization{{{label}}} {stats["utilization"]:.4f}')
+            lines.append(f'db_pool_checkouts_total{{{label}}} {stats["checkouts"]}')
+            lines.append(f'db_pool_waits_total{{{label}}} {stats["waits"]}')
+            lines.append(f'db_pool_wait_seconds_total{{{label}}} {stats["wait_time_seconds"]:.6f}')
+            lines.append(f'db_pool_timeouts_total{{{label}}} {stats["timeouts"]}')
+            lines.append(f'db_pool_health_check_failures_total{{{label}}} {stats["health_check_failures"]}')
+
+        for (name, labels), value in sorted({**counters, **gauges}.items()):
+            rendered = ','.join(f'{key}="{label}"' for key, label in labels)
+            lines.append(f'{name}{{{rendered}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+# Counter of the request being handled. Context variables follow the request into the threads
+# sync_to_async runs the ORM in, so queries are counted in whatever thread they run.
+current_counter = ContextVar('query_counter', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    counter = current_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    return counter(execute, sql, params, many, context)
+
+
+def install_query_counter(connection):
+    # Called for every new database connection, see service.signals.
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class MetricsMiddleware:
+    # Requests are grouped by URL name; unmatched paths fall into one bucket so the label set stays bounded.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        counter = QueryCounter()
+        started = time.perf_counter()
+        token = current_counter.set(counter)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_counter.reset(token)
+        self.observe(request, started, counter)
+        return response
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        token = current_counter.set(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_counter.reset(token)
+        self.observe(request, started, counter)
+        return response
+
+    def observe(self, request, started, counter):
+        match = request.resolver_match
+        endpoint = match.url_name if match and match.url_name else 'unmatched'
+        registry.observe(endpoint, time.perf_counter() - started, counter.queries, counter.db_time)
+
+
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,129 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bid',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('status', models.CharField(choices=[('Crated', 'Created'), ('Published', 'Published'), ('Cancelled', 'Cancelled')], default='Created')),
+                ('author_type', models.CharField(choices=[('Organization', 'Organization'), ('User', 'User')])),
+                ('version', models.IntegerField(default=1)),
+                ('approvements', models.IntegerField(default=0)),
+                ('approved', models.BooleanField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Employee',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('username', models.CharField(max_length=50, unique=True)),
+                ('first_name', models.CharField(blank=True, max_length=50, null=True)),
+                ('last_name', models.CharField(blank=True, max_length=50, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'employee',
+            },
+        ),
+        migrations.CreateModel(
+            name='Organization',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('type', models.CharField(choices=[('IE', 'IE'), ('LLC', 'LLC'), ('JSC', 'JSC')])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'organization',
+            },
+        ),
+        migrations.CreateModel(
+            name='Tender',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('service_type', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('Created', 'Created'), ('Published', 'Published'), ('Closed', 'Closed')], default='Created')),
+                ('version', models.IntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='service.employee')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='service.organization')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TenderVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('service_type', models.CharField(max_length=100)),
+                ('version', models.IntegerField()),
+                ('tender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='service.tender')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OrganizationResponsible',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('organization_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='service.organization')),
+                ('user_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='service.employee')),
+            ],
+            options={
+                'db_table': 'organization_responsible',
+            },
+        ),
+        migrations.CreateModel(
+            name='Feedback',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('description', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('bid', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feedback', to='service.bid')),
+                ('executor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='service.employee')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BidVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('version', models.IntegerField()),
+                ('bid', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='service.bid')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='bid',
+            name='creator',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='service.employee'),
+        ),
+        migrations.AddField(
+            model_name='bid',
+            name='organization',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='service.organization'),
+        ),
+        migrations.AddField(
+            model_name='bid',
+            name='tender',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='service.tender'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tender',
+            index=models.Index(fields=['status', 'service_type', 'created_at', 'id'], name='tender_feed_idx'),
+        ),
+    ]
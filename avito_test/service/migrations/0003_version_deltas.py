@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0002_tender_feed_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bidversion',
+            name='base_version',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bidversion',
+            name='delta',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tenderversion',
+            name='base_version',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tenderversion',
+            name='delta',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:37
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_responsibles(apps, schema_editor):
+    Organization = apps.get_model('service', 'Organization')
+    OrganizationResponsible = apps.get_model('service', 'OrganizationResponsible')
+
+    counts = OrganizationResponsible.objects.filter(organization_id=OuterRef('pk')).values('organization_id') \
+        .annotate(total=Count('id')).values('total')
+    Organization.objects.update(responsible_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0003_version_deltas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='responsible_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='BidDecision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('decision', models.CharField(choices=[('Approved', 'Approved'), ('Rejected', 'Rejected')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('approver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='service.employee')),
+                ('bid', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='decisions', to='service.bid')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='biddecision',
+            constraint=models.UniqueConstraint(fields=('bid', 'approver'), name='bid_decision_unique_approver'),
+        ),
+        migrations.RunPython(count_responsibles, migrations.RunPython.noop),
+    ]
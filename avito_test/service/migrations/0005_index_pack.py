@@ -0,0 +1,74 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:38
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def delete_duplicates(model, fields):
+    # Keeps the first row of every group that would violate the new unique constraint. The row is
+    # found by ordering rather than min(pk): PostgreSQL has no min() for the UUID keys.
+    duplicates = model.objects.values(*fields).annotate(rows=Count('pk')).filter(rows__gt=1)
+    for group in duplicates:
+        rows = model.objects.filter(**{field: group[field] for field in fields})
+        first = rows.order_by('pk').values_list('pk', flat=True).first()
+        rows.exclude(pk=first).delete()
+
+
+def deduplicate(apps, schema_editor):
+    delete_duplicates(apps.get_model('service', 'TenderVersion'), ['tender', 'version'])
+    delete_duplicates(apps.get_model('service', 'BidVersion'), ['bid', 'version'])
+    delete_duplicates(apps.get_model('service', 'OrganizationResponsible'), ['user_id', 'organization_id'])
+
+    Organization = apps.get_model('service', 'Organization')
+    OrganizationResponsible = apps.get_model('service', 'OrganizationResponsible')
+    counts = OrganizationResponsible.objects.filter(organization_id=OuterRef('pk')).values('organization_id') \
+        .annotate(total=Count('id')).values('total')
+    Organization.objects.update(responsible_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0004_bid_decisions'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['tender', 'status'], name='bid_tender_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['creator', 'name'], name='bid_creator_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['organization', 'name'], name='bid_organization_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['executor', 'created_at'], name='feedback_executor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tender',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='tender_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tender',
+            index=models.Index(fields=['organization', 'name'], name='tender_organization_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bidversion',
+            constraint=models.UniqueConstraint(fields=('bid', 'version'), name='bid_version_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='organizationresponsible',
+            constraint=models.UniqueConstraint(fields=('user_id', 'organization_id'), name='organization_responsible_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='tenderversion',
+            constraint=models.UniqueConstraint(fields=('tender', 'version'), name='tender_version_unique'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# The search vector is a generated column, so Postgres keeps it current on every insert and update.
+# Other backends (SQLite in tests and local development) search with LIKE instead and get no column.
+
+ADD_SEARCH_VECTOR = [
+    """
+    ALTER TABLE service_tender ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(service_type, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    'CREATE INDEX tender_search_idx ON service_tender USING GIN (search_vector)',
+]
+
+REMOVE_SEARCH_VECTOR = [
+    'DROP INDEX IF EXISTS tender_search_idx',
+    'ALTER TABLE service_tender DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def run_on_postgres(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0005_index_pack'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgres(ADD_SEARCH_VECTOR), run_on_postgres(REMOVE_SEARCH_VECTOR)),
+    ]
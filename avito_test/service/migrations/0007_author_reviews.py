@@ -0,0 +1,36 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:20
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_reviews(apps, schema_editor):
+    Employee = apps.get_model('service', 'Employee')
+    Feedback = apps.get_model('service', 'Feedback')
+    reviews = Feedback.objects.filter(executor=OuterRef('pk')).values('executor')
+    Employee.objects.update(
+        review_count=Coalesce(Subquery(reviews.annotate(total=Count('id')).values('total')), 0),
+        last_reviewed_at=Subquery(reviews.annotate(latest=Max('created_at')).values('latest')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0006_tender_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='review_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='last_reviewed_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(count_reviews, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:54
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0007_author_reviews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('owner_id', models.UUIDField()),
+                ('version', models.IntegerField()),
+                ('segment', models.CharField(max_length=100)),
+                ('offset', models.BigIntegerField()),
+                ('length', models.IntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='bidversion',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tenderversion',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddConstraint(
+            model_name='archivedversion',
+            constraint=models.UniqueConstraint(fields=('kind', 'owner_id', 'version'), name='archived_version_unique'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.db import migrations
+
+from service import partitioning
+
+# Opt-in with PARTITION_TABLES on PostgreSQL; elsewhere the tables stay as they are. A deployment
+# that turns the setting on later converts its tables with `manage.py create_partitions`.
+
+
+def partition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql' or not settings.PARTITION_TABLES:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in partitioning.TABLES:
+            partitioning.convert(cursor, table, settings.PARTITION_MONTHS_AHEAD, settings.PARTITION_DROP_FOREIGN_KEYS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0008_version_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0010_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bid',
+            name='author_type',
+            field=models.CharField(choices=[('Organization', 'Organization'), ('User', 'User')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='bid',
+            name='status',
+            field=models.CharField(choices=[('Crated', 'Created'), ('Published', 'Published'), ('Cancelled', 'Cancelled')], default='Created', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='organization',
+            name='type',
+            field=models.CharField(choices=[('IE', 'IE'), ('LLC', 'LLC'), ('JSC', 'JSC')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='tender',
+            name='status',
+            field=models.CharField(choices=[('Created', 'Created'), ('Published', 'Published'), ('Closed', 'Closed')], default='Created', max_length=20),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.db import models
 # Create your models here.
 
 from django.db import models
+from django.utils import timezone
 import uuid
 
 
@@ -13,6 +14,9 @@ class Employee(models.Model):
     last_name = models.CharField(max_length=50, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Kept up to date by service.signals when feedback about the employee is created or deleted.
+    review_count = models.IntegerField(default=0)
+    last_reviewed_at = models.DateTimeField(null=True)
 
     class Meta:
         db_table = 'employee'
@@ -28,7 +32,9 @@ class Organization(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
-    type = models.CharField(choices=ORGANIZATION_TYPE)
+    type = models.CharField(max_length=20, choices=ORGANIZATION_TYPE)
+    # Kept in sync with OrganizationResponsible by signals, used as the bid approval quorum.
+    responsible_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -43,6 +49,9 @@ class OrganizationResponsible(models.Model):
 
     class Meta:
         db_table = 'organization_responsible'
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'organization_id'], name='organization_responsible_unique'),
+        ]
 
 
 class Tender(models.Model):
@@ -56,12 +65,19 @@ class Tender(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField()
     service_type = models.CharField(max_length=100)
-    status = models.CharField(choices=STATUS_CHOICES, default='Created')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Created')
     version = models.IntegerField(default=1)
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE)
     creator = models.ForeignKey(Employee, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'service_type', 'created_at', 'id'], name='tender_feed_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='tender_status_created_idx'),
+            models.Index(fields=['organization', 'name'], name='tender_organization_name_idx'),
+        ]
+
 
 class TenderVersion(models.Model):
     tender = models.ForeignKey(Tender, on_delete=models.CASCADE, related_name='versions')
@@ -69,6 +85,15 @@ class TenderVersion(models.Model):
     description = models.TextField()
     service_type = models.CharField(max_length=100)
     version = models.IntegerField()
+    # Set when the description is stored as a delta against the keyframe `base_version`.
+    base_version = models.IntegerField(null=True, blank=True)
+    delta = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tender', 'version'], name='tender_version_unique'),
+        ]
 
 
 class Bid(models.Model):
@@ -86,8 +111,8 @@ class Bid(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
     name = models.CharField(max_length=255)
     description = models.TextField()
-    status = models.CharField(choices=STATUS_CHOICES, default='Created')
-    author_type = models.CharField(choices=AUTHOR_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Created')
+    author_type = models.CharField(max_length=20, choices=AUTHOR_TYPE_CHOICES)
     version = models.IntegerField(default=1)
     approvements = models.IntegerField(default=0)
     approved = models.BooleanField(null=True, blank=True)
@@ -96,12 +121,44 @@ class Bid(models.Model):
     tender = models.ForeignKey(Tender, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['tender', 'status'], name='bid_tender_status_idx'),
+            models.Index(fields=['creator', 'name'], name='bid_creator_name_idx'),
+            models.Index(fields=['organization', 'name'], name='bid_organization_name_idx'),
+        ]
+
 
 class BidVersion(models.Model):
     bid = models.ForeignKey(Bid, on_delete=models.CASCADE, related_name='versions')
     name = models.CharField(max_length=255)
     description = models.TextField()
     version = models.IntegerField()
+    base_version = models.IntegerField(null=True, blank=True)
+    delta = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bid', 'version'], name='bid_version_unique'),
+        ]
+
+
+class BidDecision(models.Model):
+    DECISION_CHOICES = [
+        ('Approved', 'Approved'),
+        ('Rejected', 'Rejected')
+    ]
+
+    bid = models.ForeignKey(Bid, on_delete=models.CASCADE, related_name='decisions')
+    approver = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    decision = models.CharField(max_length=10, choices=DECISION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bid', 'approver'], name='bid_decision_unique_approver'),
+        ]
 
 
 class Feedback(models.Model):
@@ -111,3 +168,56 @@ class Feedback(models.Model):
     executor = models.ForeignKey(Employee, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['executor', 'created_at'], name='feedback_executor_idx'),
+        ]
+
+
+class ArchivedVersion(models.Model):
+    # Where an archived tender or bid version lives: a compressed block of one segment file in
+    # VERSION_ARCHIVE_DIR, holding the archived versions of one owner. See service/archive.py.
+    kind = models.CharField(max_length=20)
+    owner_id = models.UUIDField()
+    version = models.IntegerField()
+    segment = models.CharField(max_length=100)
+    offset = models.BigIntegerField()
+    length = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'owner_id', 'version'], name='archived_version_unique'),
+        ]
+
+
+class Job(models.Model):
+    # A unit of background work run by `manage.py run_worker`, see service/jobs.py.
+    STATUS_CHOICES = [
+        ('Queued', 'Queued'),
+        ('Running', 'Running'),
+        ('Done', 'Done'),
+        ('Failed', 'Failed')
+    ]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    # At most one queued or running job per key; scheduled jobs use it to exist only once.
+    key = models.CharField(max_length=100, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Queued')
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    # A running job whose worker died is picked up again after its lease expires.
+    locked_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_due_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=models.Q(status__in=['Queued', 'Running']),
+                                    name='job_pending_key_unique'),
+        ]
@@ -0,0 +1,156 @@
+from datetime import datetime, timezone
+
+# Tender and Bid can be range-partitioned by created_at on PostgreSQL, one partition per month
+# plus a default partition that catches rows outside the pre-created months. Queries bounded by
+# created_at (the keyset feed, the bids of a tender) only scan the partitions in range.
+# The others get no pruning: /api/bids/my/ filters by creator or organization and sorts by name,
+# so it probes the creator and organization indexes of every partition and merges the results.
+# Its cost grows with the number of partitions, which is the price of partitioning bids.
+#
+# PostgreSQL requires the partition key in every unique constraint, so the primary key becomes
+# (id, created_at) and foreign keys that reference these tables can no longer be declared. A table
+# is only converted when dropping them is allowed (PARTITION_DROP_FOREIGN_KEYS); Django emulates
+# on_delete itself, but nothing in the database stops rows that reference a missing tender or bid.
+TABLES = ['service_tender', 'service_bid']
+
+
+class ForeignKeysExist(Exception):
+    pass
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(moment, months):
+    month = moment.month - 1 + months
+    return moment.replace(year=moment.year + month // 12, month=month % 12 + 1)
+
+
+def partition_name(table, start):
+    return f'{table}_y{start:%Y}m{start:%m}'
+
+
+def is_partitioned(cursor, table):
+    cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass', [table])
+    return cursor.fetchone() is not None
+
+
+def exists(cursor, name):
+    cursor.execute('SELECT to_regclass(%s)', [name])
+    return cursor.fetchone()[0] is not None
+
+
+def copied_columns(cursor, table):
+    # Generated columns are left out: the table the rows are copied into computes them.
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s AND is_generated = 'NEVER' ORDER BY ordinal_position",
+        [table],
+    )
+    return ', '.join(f'"{column}"' for column, in cursor.fetchall())
+
+
+def create_partition(cursor, table, start):
+    name = partition_name(table, start)
+    if exists(cursor, name):
+        return False
+    cursor.execute(
+        f'CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)',
+        [start, add_months(start, 1)],
+    )
+    return True
+
+
+def create_partitions(cursor, table, first, months_ahead):
+    # Monthly partitions from the month of `first` up to `months_ahead` months after the current one.
+    start = month_start(first)
+    last = add_months(month_start(datetime.now(timezone.utc)), months_ahead)
+    months = []
+    while start <= last:
+        if not exists(cursor, partition_name(table, start)):
+            months.append(start)
+        start = add_months(start, 1)
+    if not months:
+        return []
+
+    # PostgreSQL refuses a new partition while the default one holds rows of its range. The default
+    # partition is detached, the new partitions are created, the rows of their months are moved
+    # into them and the default partition is attached again, all under the caller's transaction.
+    default = f'{table}_default'
+    detached = exists(cursor, default)
+    if detached:
+        cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {default}')
+    for start in months:
+        create_partition(cursor, table, start)
+    if detached:
+        columns = copied_columns(cursor, table)
+        for start in months:
+            bounds = [start, add_months(start, 1)]
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {default} WHERE created_at >= %s AND created_at < %s RETURNING {columns}) '
+                f'INSERT INTO {table} ({columns}) SELECT {columns} FROM moved',
+                bounds,
+            )
+        cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT')
+    return [partition_name(table, start) for start in months]
+
+
+def convert(cursor, table, months_ahead, drop_foreign_keys=False):
+    # Rebuilds an existing table as a partitioned one under the same name, with the same columns,
+    # indexes and outgoing foreign keys. Holds an exclusive lock on the table until the transaction ends.
+    # Raises ForeignKeysExist if other tables reference this one and drop_foreign_keys is not set.
+    if is_partitioned(cursor, table):
+        return False
+    old = f'{table}_unpartitioned'
+
+    cursor.execute(
+        'SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s',
+        [table, f'{table}_pkey'],
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    outgoing = cursor.fetchall()
+    cursor.execute(
+        "SELECT conname, conrelid::regclass::text FROM pg_constraint WHERE confrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    incoming = cursor.fetchall()
+    if incoming and not drop_foreign_keys:
+        raise ForeignKeysExist(
+            f'{table} is referenced by foreign keys ({", ".join(name for name, _ in incoming)}), which partitioning drops; '
+            f'set PARTITION_DROP_FOREIGN_KEYS to convert it anyway'
+        )
+    columns = copied_columns(cursor, table)
+
+    for name, referencing in incoming:
+        cursor.execute(f'ALTER TABLE {referencing} DROP CONSTRAINT "{name}"')
+    cursor.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    cursor.execute(f'ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey')
+    # Index names are schema-wide, foreign key names only per table.
+    for number, (name, _) in enumerate(indexes):
+        cursor.execute(f'ALTER INDEX "{name}" RENAME TO {old}_idx{number}')
+
+    cursor.execute(
+        f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING STORAGE) '
+        f'PARTITION BY RANGE (created_at)'
+    )
+    cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)')
+    for name, definition in outgoing:
+        cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+
+    cursor.execute(f'SELECT min(created_at) FROM {old}')
+    first = cursor.fetchone()[0] or datetime.now(timezone.utc)
+    create_partitions(cursor, table, first, months_ahead)
+    cursor.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+    cursor.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {old}')
+    # The captured definitions name the original table, which is the partitioned one now.
+    for _, definition in indexes:
+        cursor.execute(definition)
+    cursor.execute(f'DROP TABLE {old}')
+    cursor.execute(f'ANALYZE {table}')
+    return True
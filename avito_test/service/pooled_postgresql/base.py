@@ -0,0 +1,43 @@
+from django.db.backends.postgresql import base as postgresql
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from service.pooling import get_pool
+
+# PostgreSQL backend that takes connections from a per-process pool instead of opening one per
+# request. Django still "closes" the connection at the end of every request; here that returns
+# it to the pool. Pool sizes and timeouts come from the POOL dict of the database settings.
+
+
+class DatabaseWrapper(postgresql.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        pool = get_pool(self.alias, self.settings_dict)
+        connection = pool.get(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params), self.is_healthy)
+        # A fresh connection sets this while connecting, a reused one has to restore it.
+        self.isolation_level = IsolationLevel(self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED))
+        return connection
+
+    def is_healthy(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except self.Database.Error:
+            return False
+
+    def _close(self):
+        if self.connection is None:
+            return
+
+        pool = get_pool(self.alias, self.settings_dict)
+        connection = self.connection
+        try:
+            if connection.closed:
+                pool.discard(connection)
+                return
+            # Roll back whatever the request left open, so the next user starts clean.
+            if connection.info.transaction_status != self.Database.extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except self.Database.Error:
+            pool.discard(connection)
+            return
+        pool.put(connection)
@@ -0,0 +1,162 @@
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    # A bounded pool of raw DB-API connections for one database alias of one process.
+    # Connections idle longer than `idle_timeout` are closed down to `min_size`, and a
+    # connection that sat idle longer than `health_check_interval` is pinged before reuse.
+
+    def __init__(self, min_size, max_size, timeout, idle_timeout, health_check_interval):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.timeouts = 0
+        self.opened = 0
+        self.closed = 0
+        self.health_check_failures = 0
+
+    def get(self, connect, is_healthy):
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                self._close_idle()
+                if self._idle:
+                    connection, returned_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    connection = returned_at = None
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f'no database connection became free in {self.timeout}s')
+                waited = True
+                self._cond.wait(remaining)
+
+            wait_time = time.monotonic() - started
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+            self.wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        if connection is not None and time.monotonic() - returned_at >= self.health_check_interval:
+            if not is_healthy(connection):
+                with self._cond:
+                    self.health_check_failures += 1
+                self.discard(connection, counted=False)
+                connection = None
+
+        if connection is None:
+            try:
+                connection = connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self.opened += 1
+        return connection
+
+    def put(self, connection):
+        with self._cond:
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, connection, counted=True):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self.closed += 1
+            if counted:
+                self._size -= 1
+                self._cond.notify()
+
+    def close_all(self):
+        # Used after fork: the child must not share sockets with its parent.
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for connection, _ in idle:
+            self.discard(connection, counted=False)
+
+    def _close_idle(self):
+        deadline = time.monotonic() - self.idle_timeout
+        while len(self._idle) > self.min_size and self._idle[0][1] < deadline:
+            connection, _ = self._idle.pop(0)
+            self._size -= 1
+            self.closed += 1
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'max_size': self.max_size,
+                'utilization': (self._size - idle) / self.max_size if self.max_size else 0.0,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_time_seconds': self.wait_time,
+                'max_wait_time_seconds': self.max_wait_time,
+                'timeouts': self.timeouts,
+                'opened': self.opened,
+                'closed': self.closed,
+                'health_check_failures': self.health_check_failures,
+            }
+
+
+pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    pool = pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = pools.get(alias)
+            if pool is None:
+                options = settings_dict.get('POOL', {})
+                pool = pools[alias] = ConnectionPool(
+                    min_size=options.get('MIN_SIZE', 0),
+                    max_size=options.get('MAX_SIZE', 10),
+                    timeout=options.get('TIMEOUT', 10),
+                    idle_timeout=options.get('IDLE_TIMEOUT', 300),
+                    health_check_interval=options.get('HEALTH_CHECK_INTERVAL', 30),
+                )
+    return pool
+
+
+def pool_stats():
+    return {alias: pool.stats() for alias, pool in list(pools.items())}
+
+
+def close_pools():
+    for pool in list(pools.values()):
+        pool.close_all()
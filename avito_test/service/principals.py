@@ -0,0 +1,179 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import signing
+
+from service.models import Employee, OrganizationResponsible
+
+
+class Principal:
+    def __init__(self, employee_id, username, organization_ids):
+        self.employee_id = employee_id
+        self.username = username
+        self.organization_ids = frozenset(organization_ids)
+
+
+class PrincipalCache:
+    # Bounded LRU of resolved principals shared by all requests of the process.
+    # Entries expire after `ttl` seconds and are dropped eagerly by the model signals.
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, username):
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return principal
+
+    def set(self, principal, generation):
+        with self._lock:
+            # An invalidation that raced with the lookup makes the loaded value stale.
+            if generation != self._generation:
+                return
+            self._entries[principal.username] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(principal.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_employee(self, employee_id):
+        with self._lock:
+            self._generation += 1
+            for username, (principal, expires_at) in list(self._entries.items()):
+                if principal.employee_id == employee_id:
+                    del self._entries[username]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL)
+
+# Access tokens carry the principal itself, HMAC-signed with SECRET_KEY and timestamped, so a request
+# with `Authorization: Bearer <token>` is authenticated without a query. Membership changes reach
+# a token only when it is reissued: ACCESS_TOKEN_TTL bounds how stale it can be.
+TOKEN_SALT = 'service.principals.token'
+
+
+def issue_token(principal):
+    return signing.dumps(
+        {'id': str(principal.employee_id), 'username': principal.username,
+         'organizations': sorted(str(organization_id) for organization_id in principal.organization_ids)},
+        salt=TOKEN_SALT, compress=True,
+    )
+
+
+def read_token(header):
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        return None
+    try:
+        data = signing.loads(token.strip(), salt=TOKEN_SALT, max_age=settings.ACCESS_TOKEN_TTL)
+    except signing.BadSignature:
+        return None
+    return Principal(uuid.UUID(data['id']), data['username'], [uuid.UUID(value) for value in data['organizations']])
+
+
+def token_principal(request):
+    # The principal of a valid, unexpired bearer token, None without one; verified once per request.
+    request = getattr(request, '_request', request)
+    if '_token_principal' not in request.__dict__:
+        request._token_principal = read_token(request.META.get('HTTP_AUTHORIZATION', ''))
+    return request._token_principal
+
+
+def caller_username(request):
+    # The `username` query parameter still names the caller; a bearer token stands in for it.
+    request = getattr(request, '_request', request)
+    username = request.GET.get('username')
+    if username:
+        return username
+    principal = token_principal(request)
+    return principal.username if principal is not None else None
+
+
+def load_principal(username):
+    employee_id = Employee.objects.filter(username=username).values_list('id', flat=True).first()
+    if employee_id is None:
+        return None
+
+    organization_ids = OrganizationResponsible.objects.filter(user_id=employee_id).values_list('organization_id', flat=True)
+    return Principal(employee_id, username, organization_ids)
+
+
+def resolve_principal(username):
+    principal = principal_cache.get(username)
+    if principal is None:
+        generation = principal_cache.generation
+        principal = load_principal(username)
+        if principal is not None:
+            principal_cache.set(principal, generation)
+    return principal
+
+
+async def aload_principal(username):
+    employee_id = await Employee.objects.filter(username=username).values_list('id', flat=True).afirst()
+    if employee_id is None:
+        return None
+
+    organization_ids = OrganizationResponsible.objects.filter(user_id=employee_id).values_list('organization_id', flat=True)
+    return Principal(employee_id, username, [organization_id async for organization_id in organization_ids])
+
+
+async def aresolve_principal(username):
+    principal = principal_cache.get(username)
+    if principal is None:
+        generation = principal_cache.generation
+        principal = await aload_principal(username)
+        if principal is not None:
+            principal_cache.set(principal, generation)
+    return principal
+
+
+def get_principal(request, username):
+    if not username:
+        return None
+
+    principal = token_principal(request)
+    if principal is not None and principal.username == username:
+        return principal
+
+    # Resolved principals also live on the request, so repeated checks inside one view are free.
+    request = getattr(request, '_request', request)
+    resolved = request.__dict__.setdefault('_principals', {})
+    if username not in resolved:
+        resolved[username] = resolve_principal(username)
+    return resolved[username]
+
+
+async def aget_principal(request, username):
+    if not username:
+        return None
+
+    principal = token_principal(request)
+    if principal is not None and principal.username == username:
+        return principal
+
+    resolved = request.__dict__.setdefault('_principals', {})
+    if username not in resolved:
+        resolved[username] = await aresolve_principal(username)
+    return resolved[username]
@@ -0,0 +1,153 @@
+import functools
+import json
+import logging
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+from service.metrics import registry
+from service.principals import caller_username
+
+logger = logging.getLogger(__name__)
+
+# Token buckets per (endpoint, client) shared by every worker process on the host. The buckets
+# live in a small SQLite file, on tmpfs by default; BEGIN IMMEDIATE serializes the read-modify-write
+# of a bucket across processes, so a client gets the same budget however requests are spread.
+# The limiter fails open: if the file cannot be used, requests are let through and logged.
+
+# Share of requests that also delete buckets which have been full long enough to be forgotten.
+PRUNE_PROBABILITY = 0.001
+
+SCHEMA = 'CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+
+
+@functools.lru_cache
+def parse_limits(value):
+    # "bid-new=30/60,bid-edit=60/60": URL name = requests / seconds.
+    limits = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, _, budget = item.partition('=')
+        requests, _, seconds = budget.partition('/')
+        limits[name.strip()] = (int(requests), float(seconds or 1))
+    return limits
+
+
+class BucketStore:
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+
+    def connection(self):
+        # One connection per thread; a forked worker opens its own, as the pid differs.
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(SCHEMA)
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    def take(self, key, capacity, period):
+        # Returns 0 if a token was taken, otherwise the seconds until one is available.
+        rate = capacity / period
+        now = time.time()
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        with connection:
+            row = connection.execute('SELECT tokens, updated FROM buckets WHERE key = ?', [key]).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            connection.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)', [key, tokens, now])
+        return wait
+
+    def prune(self, before):
+        with self.connection() as connection:
+            connection.execute('DELETE FROM buckets WHERE updated < ?', [before])
+
+
+store = BucketStore(settings.RATE_LIMIT_PATH)
+
+
+def client(request):
+    # Writers name themselves by username in the query or access token or, when creating a bid, by authorId in the body.
+    username = caller_username(request)
+    if username:
+        return f'user:{username}'
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            data = None
+        author_id = data.get('authorId') if isinstance(data, dict) else None
+        if isinstance(author_id, str) and author_id:
+            return f'author:{author_id}'
+    return f'address:{request.META.get("REMOTE_ADDR", "")}'
+
+
+def check(request):
+    # Returns a 429 response when the client is over the budget of the endpoint, otherwise None.
+    limits = parse_limits(settings.RATE_LIMITS)
+    if not limits:
+        return None
+    try:
+        endpoint = resolve(request.path_info).url_name
+    except Resolver404:
+        return None
+    if endpoint not in limits:
+        return None
+
+    capacity, period = limits[endpoint]
+    try:
+        wait = store.take(f'{endpoint}:{client(request)}', capacity, period)
+        if random.random() < PRUNE_PROBABILITY:
+            store.prune(time.time() - max(period for _, period in limits.values()))
+    except sqlite3.Error:
+        logger.exception('rate limit store %s is not usable, letting the request through', store.path)
+        registry.inc('rate_limit_requests_total', {'endpoint': endpoint, 'result': 'error'})
+        return None
+
+    registry.inc('rate_limit_requests_total', {'endpoint': endpoint, 'result': 'rejected' if wait else 'allowed'})
+    if not wait:
+        return None
+    response = JsonResponse({'reason': 'too many requests, retry later'}, status=429)
+    # Rounded first: float error would turn an exact 10 seconds into 10.0000001 and so 11.
+    response['Retry-After'] = str(math.ceil(round(wait, 3)))
+    return response
+
+
+class RateLimitMiddleware:
+    # Runs before the view, so a rejected request costs no database query.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return check(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        # Taking a token blocks on the SQLite file, so it runs in a thread rather than on the event loop.
+        if parse_limits(settings.RATE_LIMITS):
+            response = await sync_to_async(check, thread_sensitive=False)(request)
+            if response is not None:
+                return response
+        return await self.get_response(request)
@@ -0,0 +1,154 @@
+import json
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.urls import Resolver404, resolve
+
+from service.caches import process_local
+from service.principals import caller_username
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'primary_until'
+
+# Database the current request reads from. Outside of requests (commands, workers) it is the primary.
+read_alias = ContextVar('read_alias', default=DEFAULT_DB_ALIAS)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+
+@contextmanager
+def use_primary():
+    token = read_alias.set(DEFAULT_DB_ALIAS)
+    try:
+        yield
+    finally:
+        read_alias.reset(token)
+
+
+def pin_key(username):
+    return f'primary-pin:{username}'
+
+
+def pins_by_username():
+    # A pin left in a process-local cache would only be seen by the worker that served the write.
+    return not process_local()
+
+
+def writer(request):
+    # The API has no sessions: a writer is known by the username in the query or its access token
+    # or, on create, in the body.
+    username = caller_username(request)
+    if username or request.content_type != 'application/json':
+        return username
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return None
+    username = data.get('creatorUsername') if isinstance(data, dict) else None
+    return username if isinstance(username, str) else None
+
+
+def reads_only(request):
+    # Views that take their input as a POST body but do not write declare `read_only = True`;
+    # they read from replicas and do not pin the client.
+    if request.method in SAFE_METHODS:
+        return True
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return False
+    return getattr(getattr(match.func, 'view_class', None), 'read_only', False)
+
+
+def pinned_by_cookie(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaRoutingMiddleware:
+    # Reads go to a random replica, everything else goes to the primary. After a successful
+    # write its client reads from the primary for REPLICA_PIN_SECONDS, so it sees its own writes
+    # despite replication lag: by cookie and, with a shared cache, by username for clients that
+    # do not keep cookies.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not settings.READ_REPLICAS:
+            return self.get_response(request)
+
+        if not reads_only(request):
+            username = writer(request)
+            token = read_alias.set(DEFAULT_DB_ALIAS)
+            try:
+                response = self.get_response(request)
+            finally:
+                read_alias.reset(token)
+            if response.status_code < 400:
+                if username and pins_by_username():
+                    cache.set(pin_key(username), True, settings.REPLICA_PIN_SECONDS)
+                self.pin(response)
+            return response
+
+        username = caller_username(request)
+        pinned = pinned_by_cookie(request) or bool(username) and pins_by_username() and cache.get(pin_key(username), False)
+        token = read_alias.set(DEFAULT_DB_ALIAS if pinned else random.choice(settings.READ_REPLICAS))
+        try:
+            return self.get_response(request)
+        finally:
+            read_alias.reset(token)
+
+    async def __acall__(self, request):
+        if not settings.READ_REPLICAS:
+            return await self.get_response(request)
+
+        if not reads_only(request):
+            username = writer(request)
+            token = read_alias.set(DEFAULT_DB_ALIAS)
+            try:
+                response = await self.get_response(request)
+            finally:
+                read_alias.reset(token)
+            if response.status_code < 400:
+                if username and pins_by_username():
+                    await cache.aset(pin_key(username), True, settings.REPLICA_PIN_SECONDS)
+                self.pin(response)
+            return response
+
+        username = caller_username(request)
+        pinned = pinned_by_cookie(request) or bool(username) and pins_by_username() and await cache.aget(pin_key(username), False)
+        token = read_alias.set(DEFAULT_DB_ALIAS if pinned else random.choice(settings.READ_REPLICAS))
+        try:
+            return await self.get_response(request)
+        finally:
+            read_alias.reset(token)
+
+    def pin(self, response):
+        response.set_cookie(PIN_COOKIE, f'{time.time() + settings.REPLICA_PIN_SECONDS:.3f}',
+                            max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
@@ -0,0 +1,50 @@
+from django.db.models import F, Max, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from service.metrics import install_query_counter
+from service.models import Employee, Organization, OrganizationResponsible, Feedback
+from service.principals import principal_cache
+
+
+@receiver(connection_created)
+def count_request_queries(sender, connection, **kwargs):
+    install_query_counter(connection)
+
+
+@receiver([post_save, post_delete], sender=Employee)
+def invalidate_employee_principal(sender, instance, **kwargs):
+    principal_cache.invalidate_employee(instance.id)
+
+
+@receiver([post_save, post_delete], sender=OrganizationResponsible)
+def invalidate_responsible_principal(sender, instance, **kwargs):
+    principal_cache.invalidate_employee(instance.user_id_id)
+
+
+@receiver(post_save, sender=OrganizationResponsible)
+def count_added_responsible(sender, instance, created, **kwargs):
+    if created:
+        Organization.objects.filter(id=instance.organization_id_id).update(responsible_count=F('responsible_count') + 1)
+
+
+@receiver(post_delete, sender=OrganizationResponsible)
+def count_removed_responsible(sender, instance, **kwargs):
+    Organization.objects.filter(id=instance.organization_id_id).update(responsible_count=F('responsible_count') - 1)
+
+
+@receiver(post_save, sender=Feedback)
+def count_added_review(sender, instance, created, **kwargs):
+    if created:
+        Employee.objects.filter(id=instance.executor_id).update(
+            review_count=F('review_count') + 1,
+            last_reviewed_at=Greatest(Coalesce('last_reviewed_at', Value(instance.created_at)), Value(instance.created_at)),
+        )
+
+
+@receiver(post_delete, sender=Feedback)
+def count_removed_review(sender, instance, **kwargs):
+    latest = Feedback.objects.filter(executor_id=instance.executor_id).aggregate(latest=Max('created_at'))['latest']
+    Employee.objects.filter(id=instance.executor_id).update(review_count=F('review_count') - 1, last_reviewed_at=latest)
@@ -0,0 +1,15 @@
+from django.db.backends.sqlite3 import base as sqlite3
+
+# SQLite backend for local development and tests. The initial migration was written for
+# PostgreSQL and has CharFields without max_length, which the stock backend renders as the
+# invalid "varchar(None)"; this one renders a plain "varchar", as PostgreSQL does.
+
+
+def varchar(data):
+    if data['max_length'] is None:
+        return 'varchar'
+    return 'varchar(%(max_length)s)' % data
+
+
+class DatabaseWrapper(sqlite3.DatabaseWrapper):
+    data_types = {**sqlite3.DatabaseWrapper.data_types, 'CharField': varchar}
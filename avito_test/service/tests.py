@@ -1,3 +1,1059 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import random
+import shutil
+import tempfile
+from io import StringIO
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core import signing
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.http import StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from avito_test.urls import async_urlpatterns
+from service import change_stream, feed_cache, jobs, partitioning
+from service.etags import update_if_unchanged
+from service.metrics import registry
+from service import ratelimit
+from service.pooling import ConnectionPool, PoolTimeout
+from service.principals import TOKEN_SALT
+from service.routing import read_alias
+from service.models import ArchivedVersion, Employee, Organization, OrganizationResponsible, Tender, TenderVersion, Bid, BidDecision, \
+    Feedback, Job
+from service.streaming import astream_json_array, render_json_array, stream_json_array
+from service.versions import VersionStore, apply_delta, make_delta, tender_versions, bid_versions
+from service.views import search_tenders
+
+WORDS = ['tender', 'delivery', 'construction', 'of', 'the', 'and', 'steel', 'beam', 'to', 'site', 'кирпич', '—', ',', '.\n']
+
+
+def make_text(rnd, length):
+    text = ''
+    while len(text) < length:
+        text += rnd.choice(WORDS) + rnd.choice([' ', ' ', '  ', '\t'])
+    return text[:length]
+
+
+def make_tender(**fields):
+    organization = Organization.objects.create(name='organization', type='LLC')
+    # Unique across tests: resolved principals outlive the rolled back rows in the process cache.
+    creator = Employee.objects.create(username=f'creator-{uuid.uuid4().hex[:12]}')
+    OrganizationResponsible.objects.create(organization_id=organization, user_id=creator)
+    return Tender.objects.create(**{
+        'name': 'tender', 'description': 'description', 'service_type': 'Delivery',
+        'organization': organization, 'creator': creator, **fields,
+    })
+
+
+class AsyncURLConf:
+    # The URLconf asgi.py serves.
+    urlpatterns = async_urlpatterns
+
+
+class TenderFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.ids = [str(make_tender(status='Published').id) for _ in range(7)]
+        make_tender(status='Created')
+
+    def walk(self, limit):
+        ids, path = [], f'/api/tenders/?limit={limit}'
+        while True:
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            ids += [tender['id'] for tender in response.json()]
+            if 'X-Next-Cursor' not in response:
+                return ids
+            path = f'/api/tenders/?limit={limit}&cursor={response["X-Next-Cursor"]}'
+
+    def test_pages_continue_where_the_previous_ended(self):
+        for limit in (1, 3, 7, 50):
+            self.assertEqual(self.walk(limit), self.ids, limit)
+
+    @override_settings(ROOT_URLCONF=AsyncURLConf)
+    async def test_async_view_pages_the_same_way(self):
+        ids, path = [], '/api/tenders/?limit=3'
+        while True:
+            response = await self.async_client.get(path)
+            ids += [tender['id'] for tender in response.json()]
+            if 'X-Next-Cursor' not in response:
+                break
+            path = f'/api/tenders/?limit=3&cursor={response["X-Next-Cursor"]}'
+        self.assertEqual(ids, self.ids)
+        self.assertEqual((await self.async_client.get('/api/tenders/?cursor=bm9wZQ')).status_code, 400)
+
+    def test_without_limit_the_whole_feed_is_one_page(self):
+        response = self.client.get('/api/tenders/')
+        self.assertEqual([tender['id'] for tender in response.json()], self.ids)
+        self.assertNotIn('X-Next-Cursor', response)
+
+    def test_invalid_limit_and_cursor(self):
+        for query in ('limit=0', 'limit=-1', 'limit=1001', 'limit=ten', 'cursor=bm9wZQ', 'cursor=%%%'):
+            self.assertEqual(self.client.get(f'/api/tenders/?{query}').status_code, 400, query)
+        self.assertEqual(self.client.get('/api/tenders/?limit=1000').status_code, 200)
+
+
+class StreamModeTests(TestCase):
+    def setUp(self):
+        tender = make_tender(status='Published', description='line\u2028separator')
+        for number in range(4):
+            Tender.objects.create(name=f'tender {number}', description='description', service_type='Delivery',
+                                  organization=tender.organization, creator=tender.creator)
+        self.path = f'/api/tenders/my/?username={tender.creator.username}'
+
+    def test_chunked_arrays_match_the_rendered_one(self):
+        rows = list(Tender.objects.values('id', 'name', 'description', 'created_at'))
+        expected = render_json_array(rows)
+
+        async def aiterate(items):
+            for item in items:
+                yield item
+
+        async def ajoin(content):
+            return b''.join([part async for part in content])
+
+        for chunk_size in (1, 2, 5, 10):
+            self.assertEqual(b''.join(stream_json_array(rows, chunk_size)), expected)
+            self.assertEqual(async_to_sync(ajoin)(astream_json_array(aiterate(rows), chunk_size)), expected)
+
+    def test_sync_stream_matches_the_plain_response(self):
+        plain = self.client.get(self.path)
+        streamed = self.client.get(self.path + '&stream=true')
+        self.assertIsInstance(streamed, StreamingHttpResponse)
+        self.assertFalse(streamed.is_async)
+        self.assertEqual(json.loads(b''.join(streamed.streaming_content)), plain.json())
+        self.assertEqual(len(plain.json()), 5)
+
+    @override_settings(ROOT_URLCONF=AsyncURLConf)
+    async def test_asgi_stream_is_async_and_matches_the_plain_response(self):
+        for path in (self.path, self.path.replace('/tenders/', '/bids/')):
+            plain = await self.async_client.get(path)
+            streamed = await self.async_client.get(path + '&stream=true')
+            self.assertIsInstance(streamed, StreamingHttpResponse, path)
+            # Django reads sync iterators served over ASGI into memory first.
+            self.assertTrue(streamed.is_async, path)
+            body = b''.join([part async for part in streamed.streaming_content])
+            self.assertEqual(json.loads(body), plain.json(), path)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.concrete = make_tender(name='Concrete works', description='Pouring the foundation', status='Published')
+        self.steel = make_tender(name='Steel beam', description='Steel beams delivered to the site', service_type='Construction',
+                                 status='Published')
+        make_tender(name='Steel fence', description='Not published yet', status='Created')
+
+    def names(self, query):
+        return [tender.name for tender in search_tenders(query)]
+
+    @skipIf(connection.vendor == 'postgresql', 'PostgreSQL searches the tsvector column')
+    def test_like_fallback_matches_every_word_in_any_field(self):
+        self.assertEqual(self.names('steel'), ['Steel beam'])
+        self.assertEqual(self.names('STEEL site'), ['Steel beam'])
+        self.assertEqual(self.names('construction beam'), ['Steel beam'])
+        self.assertEqual(self.names('steel foundation'), [])
+        self.assertEqual(self.names('delivery'), ['Concrete works'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'the tsvector column exists on PostgreSQL only')
+    def test_full_text_search_ranks_and_understands_websearch_syntax(self):
+        self.steel.created_at = self.concrete.created_at - timedelta(days=1)
+        self.steel.save(update_fields=['created_at'])
+        Tender.objects.filter(pk=self.concrete.pk).update(description='Pouring the foundation, steel rebar')
+
+        # A hit in the name outranks a hit in the description whatever the creation order.
+        self.assertEqual(self.names('steel'), ['Steel beam', 'Concrete works'])
+        self.assertEqual(self.names('steel -beam'), ['Concrete works'])
+        self.assertEqual(self.names('"steel rebar"'), ['Concrete works'])
+        self.assertEqual(self.names('construction'), ['Steel beam'])
+
+    def test_endpoint_pages_results(self):
+        response = self.client.get('/api/tenders/search/?q=steel&limit=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([tender['id'] for tender in response.json()], [str(self.steel.id)])
+        self.assertEqual(self.client.get('/api/tenders/search/?q=steel&limit=1&offset=1').json(), [])
+
+        self.assertEqual(self.client.get('/api/tenders/search/?q=%20').status_code, 400)
+        self.assertEqual(self.client.get('/api/tenders/search/?q=steel&offset=-1').status_code, 400)
+
+
+class FeedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tender = make_tender(status='Created')
+        self.username = self.tender.creator.username
+
+    def feed_ids(self):
+        return [tender['id'] for tender in self.client.get('/api/tenders/').json()]
+
+    def test_write_makes_the_next_read_miss(self):
+        self.assertEqual(self.feed_ids(), [])
+        generation = feed_cache.get_generation()
+        Tender.objects.filter(id=self.tender.id).update(status='Published')
+        # Written behind the API's back, the cached page is still served.
+        self.assertEqual(self.feed_ids(), [])
+
+        response = self.client.put(f'/api/tenders/{self.tender.id}/status/?username={self.username}&status=Published')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(feed_cache.get_generation(), generation)
+        self.assertEqual(self.feed_ids(), [str(self.tender.id)])
+
+    def test_concurrent_misses_render_once(self):
+        threads_count = 8
+        barrier = threading.Barrier(threads_count)
+        renders = []
+        pages = []
+
+        def render():
+            renders.append(1)
+            time.sleep(0.2)
+            return b'[]', None
+
+        def read():
+            barrier.wait()
+            pages.append(feed_cache.get_or_render([], 5, None, render))
+
+        threads = [threading.Thread(target=read) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(renders), 1)
+        self.assertEqual(pages, [(b'[]', None)] * threads_count)
+
+
+class DeltaTests(TestCase):
+    def test_round_trip_of_random_edits(self):
+        rnd = random.Random(0)
+        alphabet = 'ab c\n.,é\\"'
+        for _ in range(500):
+            base = ''.join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 80)))
+            text = ''.join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 80)))
+            self.assertEqual(apply_delta(base, make_delta(base, text)), text)
+
+    def test_small_edit_of_long_text_gives_small_delta(self):
+        rnd = random.Random(1)
+        base = make_text(rnd, 15000)
+        for text in (base[:7000] + 'eighteen characters' + base[7000:],
+                     base[:1500] + 'EDITED' + base[1509:],
+                     base[:-200]):
+            delta = make_delta(base, text)
+            self.assertEqual(apply_delta(base, delta), text)
+            self.assertLess(len(json.dumps(delta)), 200)
+
+    def test_unrelated_text(self):
+        self.assertEqual(apply_delta('', make_delta('', 'new')), 'new')
+        self.assertEqual(apply_delta('old', make_delta('old', '')), '')
+
+
+class VersionStoreTests(TestCase):
+    def setUp(self):
+        self.store = VersionStore(TenderVersion, 'tender', ['name', 'description', 'service_type'], keyframe_interval=4)
+        self.tender = make_tender(description=make_text(random.Random(2), 3000))
+
+    def save_versions(self, count):
+        rnd = random.Random(3)
+        descriptions = {}
+        for version in range(1, count + 1):
+            if version > 1:
+                position = rnd.randrange(len(self.tender.description))
+                self.tender.description = self.tender.description[:position] + f' edit {version} ' + self.tender.description[position + 9:]
+                self.tender.name = f'tender v{version}'
+                self.tender.version = version
+            self.store.save(self.tender)
+            descriptions[version] = (self.tender.name, self.tender.description)
+        return descriptions
+
+    def test_every_version_reads_back(self):
+        descriptions = self.save_versions(10)
+        for version, (name, description) in descriptions.items():
+            row = self.store.get(self.tender, version)
+            self.assertEqual((row.name, row.description, row.service_type), (name, description, 'Delivery'))
+        self.assertIsNone(self.store.get(self.tender, 11))
+
+    def test_keyframes_every_interval_and_deltas_in_between(self):
+        self.save_versions(10)
+        rows = list(TenderVersion.objects.filter(tender=self.tender).order_by('version').values('version', 'base_version', 'delta', 'description'))
+        self.assertEqual([row['version'] for row in rows if row['delta'] is None], [1, 5, 9])
+        for row in rows:
+            if row['delta'] is not None:
+                self.assertEqual(row['description'], '')
+                self.assertEqual(row['base_version'], (row['version'] - 1) // 4 * 4 + 1)
+                self.assertLess(len(json.dumps(row['delta'])), 200)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = self.settings(VERSION_ARCHIVE_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.tender = make_tender(description=make_text(random.Random(4), 3000))
+        self.username = self.tender.creator.username
+        # Versions 2 and 3 are deltas against keyframe 1; archiving 1 and 2 has to re-key 3.
+        self.saved = {}
+        for version in range(1, 4):
+            self.tender.name = f'tender v{version}'
+            self.tender.description = self.tender.description[:100] + f' edit {version} ' + self.tender.description[110:]
+            self.tender.version = version
+            tender_versions.save(self.tender)
+            self.saved[version] = (self.tender.name, self.tender.description)
+        Tender.objects.filter(pk=self.tender.pk).update(version=4)
+
+        call_command('archive_versions', keep_last=1, stdout=StringIO())
+
+    def rollback(self, version):
+        return self.client.put(f'/api/tenders/{self.tender.id}/rollback/{version}/?username={self.username}')
+
+    def segment(self):
+        return os.path.join(self.directory, ArchivedVersion.objects.values_list('segment', flat=True).distinct().get())
+
+    def test_archived_versions_read_back_and_roll_back(self):
+        self.assertEqual(list(TenderVersion.objects.filter(tender=self.tender).values_list('version', 'delta')), [(3, None)])
+        self.assertEqual(ArchivedVersion.objects.filter(owner_id=self.tender.id).count(), 2)
+        for version, (name, description) in self.saved.items():
+            row = tender_versions.get(self.tender, version)
+            self.assertEqual((row.name, row.description), (name, description))
+
+        response = self.rollback(1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['name'], response.json()['version']), ('tender v1', 5))
+        self.tender.refresh_from_db()
+        self.assertEqual(self.tender.description, self.saved[1][1])
+
+    def test_unreadable_segment_fails_loudly(self):
+        with open(self.segment(), 'r+b') as segment:
+            segment.seek(20)
+            segment.write(b'corrupt')
+        with self.assertLogs('service.views', 'ERROR'):
+            self.assertEqual(self.rollback(2).status_code, 503)
+
+        os.remove(self.segment())
+        with self.assertLogs('service.views', 'ERROR'):
+            self.assertEqual(self.rollback(1).status_code, 503)
+        self.assertEqual(Tender.objects.get(pk=self.tender.pk).version, 4)
+
+        # Versions still in the table and versions never saved are unaffected.
+        self.assertEqual(self.rollback(3).status_code, 200)
+        self.assertEqual(self.rollback(99).status_code, 404)
+
+
+class BulkStatusTests(TestCase):
+    def setUp(self):
+        self.tender = make_tender()
+        self.username = self.tender.creator.username
+
+    def test_non_object_body_is_rejected(self):
+        for path, new_status in (('/api/tenders/bulk-status/', 'Closed'), ('/api/bids/bulk-status/', 'Cancelled')):
+            for body in ([str(self.tender.id)], 'ids', 1):
+                response = self.client.put(f'{path}?username={self.username}&status={new_status}', body, content_type='application/json')
+                self.assertEqual(response.status_code, 400, (path, body))
+
+    def test_closes_accessible_tenders(self):
+        response = self.client.put(f'/api/tenders/bulk-status/?username={self.username}&status=Closed',
+                                   {'ids': [str(self.tender.id)]}, content_type='application/json')
+        self.assertEqual(response.json(), {str(self.tender.id): {'status': 'Closed'}})
+        self.tender.refresh_from_db()
+        self.assertEqual(self.tender.status, 'Closed')
+
+
+class BatchStatusTests(TestCase):
+    def setUp(self):
+        self.tender = make_tender(status='Published')
+
+    def test_non_object_body_is_rejected(self):
+        for body in ([str(self.tender.id)], 'tenders', 1, None):
+            response = self.client.post('/api/statuses/', json.dumps(body), content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_statuses_of_published_tenders(self):
+        response = self.client.post('/api/statuses/', {'tenders': [str(self.tender.id)]}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['tenders'][str(self.tender.id)]['status'], 'Published')
+
+
+@override_settings(TENDER_AUTO_CLOSE_DAYS=30)
+class AutoCloseTests(TestCase):
+    def setUp(self):
+        self.tender = make_tender(status='Published')
+        Tender.objects.filter(id=self.tender.id).update(created_at=timezone.now() - timedelta(days=31))
+        self.bid = Bid.objects.create(name='bid', description='description', author_type='User', status='Published',
+                                      creator=self.tender.creator, tender=self.tender)
+
+    def run_job(self):
+        jobs.enqueue(jobs.AUTO_CLOSE, key=jobs.AUTO_CLOSE)
+        job = jobs.claim('test')
+        return job, jobs.run(job)
+
+    def test_closes_expired_tenders_and_cancels_pending_bids(self):
+        job, succeeded = self.run_job()
+        self.assertTrue(succeeded)
+        self.tender.refresh_from_db()
+        self.bid.refresh_from_db()
+        self.assertEqual((self.tender.status, self.bid.status), ('Closed', 'Cancelled'))
+        self.assertTrue(Job.objects.filter(key=jobs.AUTO_CLOSE, status='Queued').exclude(id=job.id).exists())
+
+    def test_worker_refuses_a_process_local_cache(self):
+        with self.assertRaisesMessage(CommandError, 'CACHE_BACKEND'):
+            call_command('run_worker', '--burst', stdout=StringIO())
+
+    @override_settings(JOB_MAX_ATTEMPTS=1)
+    def test_failed_recurring_job_is_scheduled_again(self):
+        def fail(job):
+            raise RuntimeError('database is down')
+
+        with mock.patch.dict(jobs.handlers, {jobs.AUTO_CLOSE: fail}), self.assertLogs('service.jobs', 'ERROR'):
+            job, succeeded = self.run_job()
+        self.assertFalse(succeeded)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'Failed')
+        self.assertTrue(Job.objects.filter(key=jobs.AUTO_CLOSE, status='Queued').exclude(id=job.id).exists())
+
+
+class ETagTests(TestCase):
+    def setUp(self):
+        self.tender = make_tender(status='Published')
+        self.username = self.tender.creator.username
+        second = Employee.objects.create(username=f'approver-{uuid.uuid4().hex[:12]}')
+        OrganizationResponsible.objects.create(organization_id=self.tender.organization, user_id=second)
+        self.bid = Bid.objects.create(name='bid', description='description', author_type='Organization', status='Published',
+                                      creator=self.tender.creator, organization=self.tender.organization, tender=self.tender)
+
+    def test_unchanged_status_is_not_modified(self):
+        path = f'/api/tenders/{self.tender.id}/status/?username={self.username}'
+        etag = self.client.get(path)['ETag']
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response['ETag']), (304, etag))
+
+        self.client.put(f'/api/tenders/{self.tender.id}/status/?username={self.username}&status=Closed')
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_stale_if_match_is_rejected(self):
+        path = f'/api/tenders/{self.tender.id}/status/?username={self.username}'
+        etag = self.client.get(path)['ETag']
+        self.assertEqual(self.client.put(path + '&status=Closed', HTTP_IF_MATCH='"0-Published"').status_code, 412)
+        response = self.client.put(path + '&status=Closed', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.put(path + '&status=Published', HTTP_IF_MATCH=etag).status_code, 412)
+        self.assertEqual(self.client.put(path + '&status=Published', HTTP_IF_MATCH=response['ETag']).status_code, 200)
+
+    def test_decision_changes_the_bid_etag(self):
+        path = f'/api/bids/{self.bid.id}/status/?username={self.username}'
+        etag = self.client.get(path)['ETag']
+        response = self.client.put(f'/api/bids/{self.bid.id}/submit-decision/?username={self.username}&decision=Approved')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.put(path + '&status=Cancelled', HTTP_IF_MATCH=etag).status_code, 412)
+        self.assertEqual(self.client.put(path + '&status=Cancelled', HTTP_IF_MATCH=response['ETag']).status_code, 200)
+
+    def test_conditional_update_misses_a_concurrent_change(self):
+        Bid.objects.filter(id=self.bid.id).update(approvements=1)
+        self.assertFalse(update_if_unchanged(self.bid, status='Cancelled'))
+        self.bid.refresh_from_db()
+        self.assertTrue(update_if_unchanged(self.bid, status='Cancelled'))
+
+    @override_settings(ROOT_URLCONF=AsyncURLConf)
+    async def test_async_views_send_the_same_tags(self):
+        for path in (f'/api/tenders/{self.tender.id}/status/', f'/api/bids/{self.bid.id}/status/'):
+            etag = (await sync_to_async(self.client.get)(path))['ETag']
+            response = await self.async_client.get(path, headers={'If-None-Match': etag})
+            self.assertEqual((response.status_code, response['ETag']), (304, etag), path)
+
+
+class ResponsibleCountTests(TestCase):
+    def test_count_follows_added_and_removed_responsibles(self):
+        tender = make_tender(status='Published')
+        organization = tender.organization
+        organization.refresh_from_db()
+        self.assertEqual(organization.responsible_count, 1)
+
+        second = Employee.objects.create(username=f'responsible-{uuid.uuid4().hex[:12]}')
+        link = OrganizationResponsible.objects.create(organization_id=organization, user_id=second)
+        organization.refresh_from_db()
+        self.assertEqual(organization.responsible_count, 2)
+
+        # With two responsibles one approval is not enough, the quorum is both of them.
+        bid = Bid.objects.create(name='bid', description='description', author_type='User', status='Published',
+                                 creator=second, tender=tender)
+        response = self.client.put(f'/api/bids/{bid.id}/submit-decision/?username={second.username}&decision=Approved')
+        self.assertEqual((response.status_code, response.json()['status']), (200, 'Published'))
+
+        link.delete()
+        organization.refresh_from_db()
+        self.assertEqual(organization.responsible_count, 1)
+
+
+class DecisionQuorumTests(TransactionTestCase):
+    # Approvals of one bid submitted from many threads at once: the quorum is reached exactly once.
+    approvers = 12
+
+    def test_concurrent_approvals_reach_quorum_once(self):
+        organization = Organization.objects.create(name='organization', type='LLC')
+        employees = [Employee.objects.create(username=f'approver-{number}') for number in range(self.approvers)]
+        for employee in employees:
+            OrganizationResponsible.objects.create(organization_id=organization, user_id=employee)
+
+        for _ in range(3):
+            tender = Tender.objects.create(name='tender', description='description', service_type='Delivery', status='Published',
+                                           organization=organization, creator=employees[0])
+            bid = Bid.objects.create(name='bid', description='description', author_type='User', status='Published',
+                                     creator=employees[0], tender=tender)
+            codes = self.approve_concurrently(bid, employees)
+
+            bid.refresh_from_db()
+            quorum = min(3, len(employees))
+            self.assertIs(bid.approved, True)
+            self.assertEqual(bid.approvements, quorum)
+            self.assertEqual(BidDecision.objects.filter(bid=bid).count(), quorum)
+            self.assertEqual(codes.count(200), quorum, codes)
+
+    def approve_concurrently(self, bid, employees):
+        barrier = threading.Barrier(len(employees))
+        codes = []
+
+        def approve(employee):
+            try:
+                client = self.client_class()
+                barrier.wait()
+                response = client.put(f'/api/bids/{bid.id}/submit-decision/?username={employee.username}&decision=Approved')
+                codes.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=approve, args=(employee,)) for employee in employees]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return codes
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(TestCase):
+    def make_pool(self, **options):
+        return ConnectionPool(**{'min_size': 0, 'max_size': 2, 'timeout': 0.05, 'idle_timeout': 300,
+                                 'health_check_interval': 30, **options})
+
+    def healthy(self, connection):
+        return True
+
+    def test_returned_connection_is_reused(self):
+        pool = self.make_pool()
+        connection = pool.get(FakeConnection, self.healthy)
+        pool.put(connection)
+
+        self.assertIs(pool.get(FakeConnection, self.healthy), connection)
+        self.assertEqual(pool.stats()['opened'], 1)
+        self.assertEqual(pool.stats()['in_use'], 1)
+
+    def test_checkout_beyond_max_size_times_out(self):
+        pool = self.make_pool()
+        pool.get(FakeConnection, self.healthy)
+        pool.get(FakeConnection, self.healthy)
+
+        with self.assertRaises(PoolTimeout):
+            pool.get(FakeConnection, self.healthy)
+        self.assertEqual(pool.stats()['size'], 2)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_checkout_waits_for_a_returned_connection(self):
+        pool = self.make_pool(max_size=1, timeout=5)
+        connection = pool.get(FakeConnection, self.healthy)
+        threading.Timer(0.05, pool.put, [connection]).start()
+
+        self.assertIs(pool.get(FakeConnection, self.healthy), connection)
+        self.assertEqual(pool.stats()['waits'], 1)
+        self.assertGreater(pool.stats()['max_wait_time_seconds'], 0)
+
+    def test_broken_connection_is_replaced(self):
+        pool = self.make_pool(health_check_interval=0)
+        broken = pool.get(FakeConnection, self.healthy)
+        pool.put(broken)
+
+        connection = pool.get(FakeConnection, lambda connection: False)
+        self.assertIsNot(connection, broken)
+        self.assertTrue(broken.closed)
+        self.assertEqual(pool.stats()['health_check_failures'], 1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_discard_frees_the_slot(self):
+        pool = self.make_pool(max_size=1)
+        connection = pool.get(FakeConnection, self.healthy)
+        pool.discard(connection)
+
+        self.assertTrue(connection.closed)
+        self.assertIsNot(pool.get(FakeConnection, self.healthy), connection)
+
+    def test_failed_connect_frees_the_slot(self):
+        pool = self.make_pool(max_size=1)
+
+        def refuse():
+            raise OSError('connection refused')
+
+        with self.assertRaises(OSError):
+            pool.get(refuse, self.healthy)
+        self.assertEqual(pool.stats()['size'], 0)
+        pool.get(FakeConnection, self.healthy)
+
+    def test_idle_connections_are_closed_down_to_min_size(self):
+        pool = self.make_pool(min_size=1, idle_timeout=0)
+        first, second = pool.get(FakeConnection, self.healthy), pool.get(FakeConnection, self.healthy)
+        pool.put(first)
+        pool.put(second)
+
+        self.assertIs(pool.get(FakeConnection, self.healthy), second)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['size'], 1)
+
+
+@override_settings(READ_REPLICAS=['replica1'])
+class ReplicaRoutingTests(TestCase):
+    # The replica is a second, migrated SQLite file that never receives the writes: a replica lagging
+    # behind for good. Whatever a request finds there it can only have read from the replica.
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        connections.settings['replica1'] = connections.configure_settings({
+            'default': connections.settings['default'],
+            'replica1': {'ENGINE': 'service.sqlite3', 'NAME': os.path.join(cls.directory, 'replica.sqlite3')},
+        })['replica1']
+        call_command('migrate', database='replica1', verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica1'].close()
+        del connections['replica1']
+        del connections.settings['replica1']
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.tender = make_tender()
+        self.username = self.tender.creator.username
+
+    def create_tender(self):
+        response = self.client.post('/api/tenders/new/', {
+            'name': 'tender', 'description': 'description', 'serviceType': 'Delivery',
+            'organizationId': str(self.tender.organization_id), 'creatorUsername': self.username,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['id']
+
+    def test_read_after_write_goes_to_the_primary(self):
+        tender_id = self.create_tender()
+        self.assertEqual(read_alias.get(), 'default')
+
+        response = self.client.get(f'/api/tenders/{tender_id}/status/?username={self.username}')
+        self.assertEqual(response.status_code, 200)
+
+        # Without the cookie the read goes to the replica, which does not have the tender.
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get(f'/api/tenders/{tender_id}/status/?username={self.username}').status_code, 404)
+        self.assertEqual(read_alias.get(), 'default')
+
+    def test_username_pins_only_with_a_shared_cache(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = f'/api/tenders/{{}}/status/?username={self.username}'
+
+        tender_id = self.create_tender()
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get(path.format(tender_id)).status_code, 404)
+
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                               'LOCATION': directory}}):
+            tender_id = self.create_tender()
+            self.client.cookies.clear()
+            self.assertEqual(self.client.get(path.format(tender_id)).status_code, 200)
+
+    @override_settings(ROOT_URLCONF=AsyncURLConf)
+    async def test_async_read_after_write_goes_to_the_primary(self):
+        tender_id = await sync_to_async(self.create_tender)()
+        self.async_client.cookies = self.client.cookies
+
+        response = await self.async_client.get(f'/api/tenders/{tender_id}/status/?username={self.username}')
+        self.assertEqual(response.status_code, 200)
+
+        self.async_client.cookies.clear()
+        response = await self.async_client.get(f'/api/tenders/{tender_id}/status/?username={self.username}')
+        self.assertEqual(response.status_code, 404)
+
+
+class ChangeStreamTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # On PostgreSQL subscribing starts the listener, whose connection would keep the test database open.
+        cls.addClassCleanup(change_stream.stop_listener)
+
+    def setUp(self):
+        self.tender = make_tender(status='Published')
+        self.username = self.tender.creator.username
+
+    def subscribe(self, *keys):
+        subscription = change_stream.broker.subscribe(change_stream.Subscription(set(keys)))
+        self.addCleanup(change_stream.broker.unsubscribe, subscription)
+        return subscription
+
+    def test_broker_delivers_to_matching_subscribers_only(self):
+        watching = self.subscribe(('tender', str(self.tender.id)))
+        other = self.subscribe(('bid', str(self.tender.id)))
+
+        change_stream.broker.deliver(change_stream.event('tender', self.tender))
+        self.assertEqual(watching.get(0), change_stream.event('tender', self.tender))
+        self.assertIsNone(other.get(0))
+
+        change_stream.broker.unsubscribe(watching)
+        change_stream.broker.deliver(change_stream.event('tender', self.tender))
+        self.assertIsNone(watching.get(0))
+
+    @skipIf(connection.vendor == 'postgresql', 'PostgreSQL delivers through LISTEN/NOTIFY')
+    def test_write_is_published_on_commit(self):
+        subscription = self.subscribe(('tender', str(self.tender.id)))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.put(f'/api/tenders/{self.tender.id}/status/?status=Closed&username={self.username}')
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(subscription.get(0))
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(subscription.get(0), {'type': 'tender', 'id': str(self.tender.id), 'status': 'Closed', 'version': 1})
+
+    @override_settings(CHANGE_STREAM_TIMEOUT=0.2)
+    def test_stream_sends_snapshot_then_changes(self):
+        response = self.client.get(f'/api/changes/stream/?tenders={self.tender.id}')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = response.streaming_content
+
+        self.assertEqual(next(content), change_stream.STREAM_PREAMBLE)
+        self.assertEqual(next(content), change_stream.encode(change_stream.event('tender', self.tender)))
+        self.tender.status = 'Closed'
+        change_stream.broker.deliver(change_stream.event('tender', self.tender))
+        self.assertEqual(next(content), change_stream.encode(change_stream.event('tender', self.tender)))
+        # Nothing more happens until the stream times out.
+        self.assertEqual(set(content), {change_stream.KEEPALIVE})
+
+
+@skipUnless(connection.vendor == 'postgresql', 'LISTEN/NOTIFY needs PostgreSQL')
+class ChangeStreamNotifyTests(TransactionTestCase):
+    # NOTIFY is delivered on commit, to the listener thread's own connection.
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.addClassCleanup(change_stream.stop_listener)
+
+    def test_committed_change_reaches_subscribers(self):
+        tender = make_tender(status='Published')
+        subscription = change_stream.broker.subscribe(change_stream.Subscription({('tender', str(tender.id))}))
+        self.addCleanup(change_stream.broker.unsubscribe, subscription)
+
+        with transaction.atomic():
+            change_stream.publish(change_stream.event('tender', tender))
+            self.assertIsNone(subscription.get(0.2))
+        self.assertEqual(subscription.get(5), change_stream.event('tender', tender))
+
+
+class ReviewCountTests(TestCase):
+    def setUp(self):
+        self.tender = make_tender(status='Published')
+        self.author = Employee.objects.create(username=f'author-{uuid.uuid4().hex[:12]}')
+        self.bid = Bid.objects.create(name='bid', description='description', author_type='User', status='Approved',
+                                      approved=True, creator=self.author, tender=self.tender)
+        self.requester = self.tender.creator.username
+
+    def review(self, text):
+        response = self.client.put(f'/api/bids/{self.bid.id}/feedback/?bidFeedback={text}&username={self.requester}')
+        self.assertEqual(response.status_code, 200)
+
+    def reviews(self):
+        return self.client.get(f'/api/bids/{self.tender.id}/reviews/?authorUsername={self.author.username}'
+                               f'&requesterUsername={self.requester}')
+
+    def test_count_follows_created_and_deleted_reviews(self):
+        self.review('good')
+        self.review('fine')
+        first, second = Feedback.objects.filter(executor=self.author).order_by('created_at', 'id')
+
+        response = self.reviews()
+        self.assertEqual(response['X-Review-Count'], '2')
+        self.assertEqual(response['X-Last-Review-At'], second.created_at.isoformat())
+
+        second.delete()
+        response = self.reviews()
+        self.assertEqual(response['X-Review-Count'], '1')
+        self.assertEqual(response['X-Last-Review-At'], first.created_at.isoformat())
+
+        first.delete()
+        response = self.reviews()
+        self.assertEqual(response['X-Review-Count'], '0')
+        self.assertNotIn('X-Last-Review-At', response)
+        self.author.refresh_from_db()
+        self.assertEqual((self.author.review_count, self.author.last_reviewed_at), (0, None))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'tables are only partitioned on PostgreSQL')
+class PartitioningTests(TestCase):
+    # DDL is transactional on PostgreSQL: each test's conversion is rolled back with the rest of it.
+
+    def setUp(self):
+        self.old = make_tender(status='Published')
+        self.new = make_tender(status='Published')
+        Tender.objects.filter(pk=self.old.pk).update(created_at=datetime(2020, 1, 15, tzinfo=dt_timezone.utc))
+        Bid.objects.create(name='bid', description='description', author_type='User', status='Published',
+                           creator=self.new.creator, tender=self.new)
+
+    def partition_of(self, cursor, tender):
+        cursor.execute('SELECT tableoid::regclass::text FROM service_tender WHERE id = %s', [tender.id])
+        return cursor.fetchone()[0]
+
+    def test_conversion_refuses_to_drop_foreign_keys(self):
+        with connection.cursor() as cursor:
+            with self.assertRaises(partitioning.ForeignKeysExist):
+                partitioning.convert(cursor, 'service_tender', 1)
+            self.assertFalse(partitioning.is_partitioned(cursor, 'service_tender'))
+
+    @override_settings(PARTITION_TABLES=True, PARTITION_DROP_FOREIGN_KEYS=True, PARTITION_MONTHS_AHEAD=1)
+    def test_migration_partitions_and_new_partitions_take_rows_from_default(self):
+        migration = importlib.import_module('service.migrations.0009_partition_tables')
+        with connection.cursor() as cursor:
+            # The rows of setUp leave deferred foreign key checks pending, which would block ALTER TABLE.
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        with connection.schema_editor(atomic=False) as schema_editor:
+            migration.partition_tables(None, schema_editor)
+
+        with connection.cursor() as cursor:
+            self.assertTrue(partitioning.is_partitioned(cursor, 'service_tender'))
+            self.assertTrue(partitioning.is_partitioned(cursor, 'service_bid'))
+            self.assertEqual(self.partition_of(cursor, self.old), 'service_tender_y2020m01')
+            self.assertEqual(Tender.objects.filter(pk__in=[self.old.pk, self.new.pk]).count(), 2)
+
+            # A row beyond the created months lands in the default partition until its month is created.
+            later = datetime.now(dt_timezone.utc).replace(day=1) + timedelta(days=31 * 6)
+            Tender.objects.filter(pk=self.new.pk).update(created_at=later)
+            self.assertEqual(self.partition_of(cursor, self.new), 'service_tender_default')
+
+            partition = partitioning.partition_name('service_tender', partitioning.month_start(later))
+            self.assertIn(partition, partitioning.create_partitions(cursor, 'service_tender', later, 8))
+            self.assertEqual(self.partition_of(cursor, self.new), partition)
+            cursor.execute('SELECT count(*) FROM service_tender_default')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+        response = self.client.get(f'/api/bids/my/?username={self.new.creator.username}')
+        self.assertEqual(len(response.json()), 1)
+
+
+@override_settings(RATE_LIMITS='tender-status=2/60')
+class RateLimitTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = mock.patch.object(ratelimit, 'store', ratelimit.BucketStore(os.path.join(self.directory, 'buckets.sqlite3')))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.tender = make_tender(status='Published')
+        self.path = f'/api/tenders/{self.tender.id}/status/?username={self.tender.creator.username}'
+
+    def test_over_budget_is_rejected_with_retry_after(self):
+        self.assertEqual([self.client.get(self.path).status_code for _ in range(2)], [200, 200])
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, 429)
+        # Two requests per minute: a token every 30 seconds.
+        self.assertEqual(response['Retry-After'], '30')
+
+        other = make_tender(status='Published')
+        self.assertEqual(self.client.get(f'/api/tenders/{other.id}/status/?username={other.creator.username}').status_code, 200)
+        self.assertEqual(self.client.get('/api/tenders/').status_code, 200)
+
+    def test_bucket_refills_over_time(self):
+        now = time.time()
+        with mock.patch('service.ratelimit.time.time', return_value=now):
+            for _ in range(2):
+                self.client.get(self.path)
+            self.assertEqual(self.client.get(self.path).status_code, 429)
+        with mock.patch('service.ratelimit.time.time', return_value=now + 20):
+            self.assertEqual(self.client.get(self.path)['Retry-After'], '10')
+        with mock.patch('service.ratelimit.time.time', return_value=now + 31):
+            self.assertEqual(self.client.get(self.path).status_code, 200)
+            self.assertEqual(self.client.get(self.path).status_code, 429)
+
+    def test_unusable_store_lets_requests_through(self):
+        broken = ratelimit.BucketStore(os.path.join(self.directory, 'missing', 'buckets.sqlite3'))
+        with mock.patch.object(ratelimit, 'store', broken), self.assertLogs('service.ratelimit', 'ERROR'):
+            self.assertEqual([self.client.get(self.path).status_code for _ in range(3)], [200, 200, 200])
+
+    @override_settings(ROOT_URLCONF=AsyncURLConf)
+    async def test_async_over_budget_is_rejected_off_the_event_loop(self):
+        threads = []
+        check = ratelimit.check
+
+        def recording_check(request):
+            threads.append(threading.get_ident())
+            return check(request)
+
+        with mock.patch.object(ratelimit, 'check', recording_check):
+            codes = [(await self.async_client.get(self.path)).status_code for _ in range(3)]
+        self.assertEqual(codes, [200, 200, 429])
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(threading.get_ident(), threads)
+
+
+class AccessTokenTests(TestCase):
+    def setUp(self):
+        self.tender = make_tender()
+        self.username = self.tender.creator.username
+        self.token = self.client.post(f'/api/auth/token/?username={self.username}').json()['token']
+
+    def my_tenders(self, token=None, query=''):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return self.client.get(f'/api/tenders/my/{query}', headers=headers)
+
+    def test_valid_token_names_the_caller(self):
+        response = self.my_tenders(self.token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([tender['id'] for tender in response.json()], [str(self.tender.id)])
+        # The token carries the organizations too: the unpublished tender is visible to its owner.
+        response = self.client.get(f'/api/tenders/{self.tender.id}/status/', headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ACCESS_TOKEN_TTL=60)
+    def test_expired_token_is_rejected(self):
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 61):
+            self.assertEqual(self.my_tenders(self.token).status_code, 401)
+        self.assertEqual(self.my_tenders(self.token).status_code, 200)
+
+    def test_tampered_or_foreign_token_is_rejected(self):
+        payload, _, signature = self.token.rpartition(':')
+        tampered = f'{payload}:{signature[:-1]}{"A" if signature[-1] != "A" else "B"}'
+        self.assertEqual(self.my_tenders(tampered).status_code, 401)
+
+        data = signing.loads(self.token, salt=TOKEN_SALT)
+        self.assertEqual(self.my_tenders(signing.dumps(data, salt='service.other')).status_code, 401)
+        self.assertEqual(self.my_tenders(signing.dumps({**data, 'username': 'someone'}, salt=TOKEN_SALT, key='x')).status_code, 401)
+
+    def test_username_parameter_still_names_the_caller(self):
+        self.assertEqual(self.my_tenders(query=f'?username={self.username}').status_code, 200)
+
+        # With both, the parameter wins and its user is resolved from the database.
+        other = make_tender()
+        response = self.my_tenders(self.token, query=f'?username={other.creator.username}')
+        self.assertEqual([tender['id'] for tender in response.json()], [str(other.id)])
+        self.assertEqual(self.my_tenders(self.token, query='?username=nobody').status_code, 401)
+
+
+class QueryPlanTests(TestCase):
+    # The queries every endpoint actually runs must be answered from an index. They are captured
+    # from requests to the views and explained as sent; on PostgreSQL sequential scans are priced
+    # out, so the planner only picks one when no index fits the query.
+
+    def setUp(self):
+        cache.clear()
+        tender = make_tender(status='Published')
+        bid = Bid.objects.create(name='bid', description='description', author_type='Organization', status='Published',
+                                 creator=tender.creator, organization=tender.organization, tender=tender)
+        # Snapshot version 1 and move on, as an edit would, so that there is something to roll back to.
+        tender_versions.save(tender)
+        bid_versions.save(bid)
+        Tender.objects.filter(pk=tender.pk).update(version=2)
+        Bid.objects.filter(pk=bid.pk).update(version=2)
+        Feedback.objects.create(bid=bid, executor=tender.creator, description='feedback')
+        self.tender, self.bid = tender, bid
+
+    def requests(self):
+        tender, bid, username = self.tender, self.bid, self.tender.creator.username
+        requests = [
+            ('GET', '/api/tenders/?limit=5'),
+            ('GET', '/api/tenders/?limit=5&serviceType[]=Delivery'),
+            ('GET', f'/api/tenders/my/?username={username}'),
+            ('GET', f'/api/tenders/{tender.id}/status/?username={username}'),
+            ('GET', f'/api/bids/my/?username={username}'),
+            ('GET', f'/api/bids/{tender.id}/list/?username={username}'),
+            ('GET', f'/api/bids/{bid.id}/status/?username={username}'),
+            ('GET', f'/api/bids/{tender.id}/reviews/?authorUsername={username}&requesterUsername={username}'),
+            ('PUT', f'/api/tenders/{tender.id}/rollback/1/?username={username}'),
+            ('PUT', f'/api/bids/{bid.id}/rollback/1/?username={username}'),
+        ]
+        if connection.vendor == 'postgresql':
+            # Elsewhere search falls back to LIKE, which scans by design.
+            requests.append(('GET', '/api/tenders/search/?q=Delivery'))
+        return requests
+
+    def full_scans(self, plan):
+        if connection.vendor == 'postgresql':
+            return re.findall(r'Seq Scan on (\w+)', plan)
+        # SQLite: "SCAN table" without an index is a full table scan.
+        return re.findall(r'SCAN (\w+)$', plan, re.MULTILINE)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN {sql}')
+                return '\n'.join(row[0] for row in cursor.fetchall())
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def test_endpoint_queries_use_indexes(self):
+        for method, path in self.requests():
+            with self.subTest(f'{method} {path}'):
+                with CaptureQueriesContext(connection) as captured:
+                    response = getattr(self.client, method.lower())(path)
+                self.assertEqual(response.status_code, 200, response.content)
+                selects = [query['sql'] for query in captured.captured_queries if query['sql'].startswith('SELECT')]
+                self.assertTrue(selects)
+                with transaction.atomic():
+                    if connection.vendor == 'postgresql':
+                        with connection.cursor() as cursor:
+                            cursor.execute('SET LOCAL enable_seqscan = off')
+                    for sql in selects:
+                        plan = self.explain(sql)
+                        self.assertEqual(self.full_scans(plan), [], f'{sql}\n{plan}')
+
+
+class QueryMetricsTests(TestCase):
+    def setUp(self):
+        self.tender = make_tender()
+        self.path = f'/api/tenders/{self.tender.id}/status/?username={self.tender.creator.username}'
+
+    def counted_queries(self, endpoint):
+        stats = registry._endpoints.get(endpoint)
+        return stats.queries if stats else 0
+
+    def test_sync_views_count_queries(self):
+        before = self.counted_queries('tender-status')
+        self.assertEqual(self.client.get(self.path).status_code, 200)
+        self.assertGreater(self.counted_queries('tender-status'), before)
+
+    @override_settings(ROOT_URLCONF=AsyncURLConf)
+    async def test_async_views_count_queries(self):
+        # The async ORM runs its queries in other threads than the middleware.
+        before = self.counted_queries('tender-status')
+        response = await self.async_client.get(self.path)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.counted_queries('tender-status'), before)
@@ -0,0 +1,95 @@
+import difflib
+import json
+import re
+
+from django.conf import settings
+
+from service import archive
+from service.models import TenderVersion, BidVersion
+
+
+TOKEN = re.compile(r'\w+|\s+|[^\w\s]')
+
+
+def tokenize(text):
+    # Words, whitespace runs and single punctuation marks, with the offset each one starts at.
+    tokens = TOKEN.findall(text)
+    offsets = [0]
+    for token in tokens:
+        offsets.append(offsets[-1] + len(token))
+    return tokens, offsets
+
+
+def make_delta(base, text):
+    # A delta is a list of [start, end] slices copied from the base and literal strings inserted between them.
+    # Texts are compared word by word; autojunk would treat common words of long texts as noise and
+    # turn a small edit into a delta as large as the text.
+    base_tokens, base_offsets = tokenize(base)
+    text_tokens, text_offsets = tokenize(text)
+    delta = []
+    matcher = difflib.SequenceMatcher(None, base_tokens, text_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        start, end = base_offsets[i1], base_offsets[i2]
+        if tag == 'equal':
+            if delta and isinstance(delta[-1], list) and delta[-1][1] == start:
+                delta[-1][1] = end
+            else:
+                delta.append([start, end])
+        elif tag in ('replace', 'insert'):
+            inserted = text[text_offsets[j1]:text_offsets[j2]]
+            if delta and isinstance(delta[-1], str):
+                delta[-1] += inserted
+            else:
+                delta.append(inserted)
+    return delta
+
+
+def apply_delta(base, delta):
+    return ''.join(base[op[0]:op[1]] if isinstance(op, list) else op for op in delta)
+
+
+class VersionStore:
+    # Versions are stored as full keyframes every `keyframe_interval` versions, the rows in
+    # between keep only a delta of the description against their keyframe. Reading any
+    # version costs at most two row reads: the version itself and its keyframe. Versions moved out
+    # by `manage.py archive_versions` are read back from the archive.
+
+    def __init__(self, model, owner_field, fields, keyframe_interval):
+        self.model = model
+        self.owner_field = owner_field
+        self.fields = fields
+        self.keyframe_interval = keyframe_interval
+
+    def versions(self, owner):
+        return self.model.objects.filter(**{self.owner_field: owner})
+
+    def save(self, owner):
+        values = {field: getattr(owner, field) for field in self.fields}
+        keyframe = self.versions(owner).filter(delta__isnull=True).order_by('-version').values('version', 'description').first()
+
+        if keyframe is not None and owner.version - keyframe['version'] < self.keyframe_interval:
+            delta = make_delta(keyframe['description'], owner.description)
+            if len(json.dumps(delta)) < len(owner.description):
+                values.update(description='', base_version=keyframe['version'], delta=delta)
+
+        return self.model.objects.create(**{self.owner_field: owner}, version=owner.version, **values)
+
+    def get(self, owner, version):
+        row = self.versions(owner).filter(version=version).values(*self.fields, 'base_version', 'delta').first()
+        if row is None:
+            row = archive.load(self.model._meta.model_name, owner.id, version)
+            if row is None:
+                return None
+            return self.model(**{self.owner_field: owner}, version=version, **row)
+
+        base_version = row.pop('base_version')
+        delta = row.pop('delta')
+        if delta is not None:
+            base = self.versions(owner).filter(version=base_version).values_list('description', flat=True).first()
+            row['description'] = apply_delta(base, delta)
+
+        return self.model(**{self.owner_field: owner}, version=version, **row)
+
+
+tender_versions = VersionStore(TenderVersion, 'tender', ['name', 'description', 'service_type'], settings.VERSION_KEYFRAME_INTERVAL)
+bid_versions = VersionStore(BidVersion, 'bid', ['name', 'description'], settings.VERSION_KEYFRAME_INTERVAL)
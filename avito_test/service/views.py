@@ -1,39 +1,269 @@
+import base64
+import logging
+import uuid
+
+from django.conf import settings
+from django.db import connections, transaction, IntegrityError
+from django.db.models import BooleanField, Q, F
+from django.db.models.expressions import RawSQL
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
+from django.utils.dateparse import parse_datetime
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from service.models import Tender, Organization, Employee, OrganizationResponsible, TenderVersion, Bid, \
-    BidVersion, Feedback
+from service import archive, change_stream, feed_cache
+from service.etags import if_match_failed, if_none_match, with_etag, update_if_unchanged, save_new_version
+from service.models import Tender, Organization, Employee, OrganizationResponsible, Bid, BidDecision, Feedback
+from service.principals import caller_username, get_principal, issue_token, resolve_principal
+from service.routing import use_primary
 from service.serializers import TenderSerializer, BidSerializer, FeedbackSerializer
+from service.streaming import streaming_response, wants_stream, render_json_array
+from service.versions import tender_versions, bid_versions
 
+DEFAULT_PAGE_LIMIT = 5
+MAX_PAGE_LIMIT = 50
+# The tender feed was unpaginated: a client that sends no limit still gets the whole feed up to this size.
+FEED_PAGE_LIMIT = 1000
+MAX_SEARCH_QUERY_LENGTH = 200
+MAX_BULK_IDS = 10000
+BULK_CHUNK_SIZE = 1000
+MAX_WATCHED_IDS = 1000
 
-def check_access(tender_id, username):
-    tender = Tender.objects.get(id=tender_id)
+logger = logging.getLogger(__name__)
 
-    employee = Employee.objects.get(username=username)
-    organization_responsibilities = OrganizationResponsible.objects.filter(user_id=employee)
-    organizations = organization_responsibilities.values_list('organization_id', flat=True)
 
-    if tender.organization in organizations:
-        return True
-    return False
+def check_access(tender, principal):
+    return tender.organization_id in principal.organization_ids
 
 
-def check_access_for_bid(bid_id, username):
-    bid = Bid.objects.get(id=bid_id)
+def check_access_for_bid(bid, principal):
+    if principal.organization_ids:
+        return bid.organization_id in principal.organization_ids
+    return bid.creator_id == principal.employee_id
 
-    employee = Employee.objects.get(username=username)
 
-    if OrganizationResponsible.objects.filter(user_id=employee).exists():
-        organization_responsibilities = OrganizationResponsible.objects.filter(user_id=employee)
-        organization = organization_responsibilities.organization_id
+def encode_cursor(created_at, object_id):
+    raw = f'{created_at.isoformat()}|{object_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
 
-        if bid.organization == organization:
-            return True
-    elif bid.creator == employee:
-        return True
-    return False
+
+def decode_cursor(cursor):
+    try:
+        created_at, object_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        created_at = parse_datetime(created_at)
+        object_id = uuid.UUID(object_id)
+    except (ValueError, UnicodeError):
+        return None
+    if created_at is None:
+        return None
+    return created_at, object_id
+
+
+def parse_limit(value, default=DEFAULT_PAGE_LIMIT, maximum=MAX_PAGE_LIMIT):
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        return None
+    if limit < 1 or limit > maximum:
+        return None
+    return limit
+
+
+def keyset_query(queryset, cursor, limit):
+    # Rows are walked in (created_at, id) order, so a page is a range scan on the index
+    # starting right after the last row of the previous page, however deep the client is.
+    # `queryset` is a .values() queryset that includes created_at and id. One row more than
+    # the page is fetched to know whether there is a next page.
+    if cursor:
+        created_at, object_id = cursor
+        queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=object_id))
+    return queryset.order_by('created_at', 'id')[:limit + 1]
+
+
+def page_with_cursor(rows, limit):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+    return rows, next_cursor
+
+
+def keyset_page(queryset, cursor, limit):
+    return page_with_cursor(list(keyset_query(queryset, cursor, limit)), limit)
+
+
+async def akeyset_page(queryset, cursor, limit):
+    return page_with_cursor([row async for row in keyset_query(queryset, cursor, limit)], limit)
+
+
+def parse_feed_page(params):
+    # Returns (limit, raw cursor, decoded cursor) of a tender feed request, or None and the reason of a 400.
+    limit = parse_limit(params.get('limit'), FEED_PAGE_LIMIT, FEED_PAGE_LIMIT)
+    if limit is None:
+        return None, f'limit must be a number from 1 to {FEED_PAGE_LIMIT}'
+    raw_cursor = params.get('cursor')
+    cursor = decode_cursor(raw_cursor) if raw_cursor else None
+    if raw_cursor and cursor is None:
+        return None, 'invalid cursor'
+    return (limit, raw_cursor, cursor), None
+
+
+def published_tenders(service_types):
+    tenders = Tender.objects.filter(status='Published')
+    if service_types:
+        tenders = tenders.filter(service_type__in=service_types)
+    return tenders.values(*TenderSerializer.Meta.fields)
+
+
+def record_decision(bid, principal, decision, quorum):
+    # The unique (bid, approver) row makes every approver count once, the counter is bumped in SQL
+    # so concurrent approvals never overwrite each other. Returns False if the bid got a final
+    # decision in the meantime; the decision row is rolled back then.
+    with transaction.atomic():
+        BidDecision.objects.create(bid=bid, approver_id=principal.employee_id, decision=decision)
+
+        pending = Bid.objects.filter(id=bid.id, approved__isnull=True).exclude(status='Cancelled')
+        if decision == 'Rejected':
+            updated = pending.update(approved=False, status='Cancelled')
+        else:
+            updated = pending.update(approvements=F('approvements') + 1)
+            if updated:
+                pending.filter(approvements__gte=quorum).update(approved=True)
+
+        if not updated:
+            transaction.set_rollback(True)
+    return bool(updated)
+
+
+def parse_offset(value):
+    if value is None:
+        return 0
+    try:
+        offset = int(value)
+    except ValueError:
+        return None
+    return offset if offset >= 0 else None
+
+
+def search_tenders(query):
+    tenders = Tender.objects.filter(status='Published')
+
+    if connections[tenders.db].vendor == 'postgresql':
+        # search_vector is a generated tsvector column with a GIN index, see migration 0006.
+        tsquery = "websearch_to_tsquery('simple', %s)"
+        return tenders.filter(RawSQL(f'service_tender.search_vector @@ {tsquery}', [query], output_field=BooleanField())) \
+            .annotate(rank=RawSQL(f'ts_rank_cd(service_tender.search_vector, {tsquery})', [query])) \
+            .order_by('-rank', 'created_at', 'id')
+
+    for word in query.split():
+        tenders = tenders.filter(Q(name__icontains=word) | Q(description__icontains=word) | Q(service_type__icontains=word))
+    return tenders.order_by('created_at', 'id')
+
+
+def archive_unavailable(kind, version):
+    logger.exception('rollback to archived %s version %s failed', kind, version)
+    return Response({'reason': f'{kind} version {version} is archived and the archive can not be read now, retry later'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+def precondition_failed(kind):
+    return Response({'reason': f'{kind} was modified, fetch it again and retry'}, status=status.HTTP_412_PRECONDITION_FAILED)
+
+
+def parse_ids(values):
+    if not isinstance(values, list) or not values or len(values) > MAX_BULK_IDS:
+        return None
+    try:
+        return list(dict.fromkeys(uuid.UUID(str(value)) for value in values))
+    except ValueError:
+        return None
+
+
+def chunked(items, size=BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bulk_set_status(model, ids, new_status, principal, has_access, fields):
+    # One read per chunk finds and authorizes the objects, one UPDATE per chunk changes them.
+    found = {}
+    versions = {}
+    for chunk in chunked(ids):
+        for obj in model.objects.filter(id__in=chunk).only('version', *fields):
+            found[obj.id] = has_access(obj, principal)
+            versions[obj.id] = obj.version
+
+    allowed = [object_id for object_id, access in found.items() if access]
+    kind = model.__name__.lower()
+    with transaction.atomic():
+        for chunk in chunked(allowed):
+            model.objects.filter(id__in=chunk).update(status=new_status)
+        change_stream.publish(*[
+            {'type': kind, 'id': str(object_id), 'status': new_status, 'version': versions[object_id]}
+            for object_id in allowed
+        ])
+
+    results = {}
+    for object_id in ids:
+        if object_id not in found:
+            results[str(object_id)] = {'reason': 'not found'}
+        elif not found[object_id]:
+            results[str(object_id)] = {'reason': 'forbidden'}
+        else:
+            results[str(object_id)] = {'status': new_status}
+    return results
+
+
+def lookup_statuses(model, ids, principal, has_access, fields):
+    # One read per chunk, with the visibility rules of the single-object status GETs.
+    results = {str(object_id): {'reason': 'not found'} for object_id in ids}
+    for chunk in chunked(ids):
+        for obj in model.objects.filter(id__in=chunk).only('status', *fields):
+            if obj.status != 'Published' and not (principal and has_access(obj, principal)):
+                results[str(obj.id)] = {'reason': 'forbidden'}
+            else:
+                results[str(obj.id)] = {'status': obj.status}
+    return results
+
+
+def parse_watched_ids(value):
+    if not value:
+        return []
+    ids = parse_ids(value.split(','))
+    if ids is None or len(ids) > MAX_WATCHED_IDS:
+        return None
+    return ids
+
+
+def change_snapshot(tender_ids, bid_ids, principal):
+    # Current state of the watched objects, or None if one of them is not published and not the
+    # principal's. Read from the primary, like the changes that will follow it.
+    with use_primary():
+        tenders = list(Tender.objects.filter(id__in=tender_ids).only('status', 'version', 'organization_id'))
+        bids = list(Bid.objects.filter(id__in=bid_ids).only('status', 'version', 'organization_id', 'creator_id'))
+
+    for tender in tenders:
+        if tender.status != 'Published' and not (principal and check_access(tender, principal)):
+            return None
+    for bid in bids:
+        if bid.status != 'Published' and not (principal and check_access_for_bid(bid, principal)):
+            return None
+    return [change_stream.event('tender', tender) for tender in tenders] + [change_stream.event('bid', bid) for bid in bids]
+
+
+def watched_keys(tender_ids, bid_ids):
+    return {('tender', str(object_id)) for object_id in tender_ids} | {('bid', str(object_id)) for object_id in bid_ids}
+
+
+def event_stream_response(content):
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 class Ping(APIView):
@@ -41,37 +271,79 @@ class Ping(APIView):
         return Response('ok', status=status.HTTP_200_OK)
 
 
+class IssueToken(APIView):
+    def post(self, request):
+        username = request.query_params.get('username')
+
+        if not username:
+            return Response({'reason': 'provide username'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Looked up afresh rather than taken from a presented token, so membership changes land in the new token.
+        principal = resolve_principal(username)
+        if principal is None:
+            return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        return Response({'token': issue_token(principal), 'expiresIn': settings.ACCESS_TOKEN_TTL}, status=status.HTTP_200_OK)
+
+
 class GetTender(APIView):
     def get(self, request):
         service_types = request.query_params.getlist('serviceType[]')
 
-        if service_types:
-            tenders = Tender.objects.filter(service_type__in=service_types, status='Published')
-        else:
-            tenders = Tender.objects.filter(status='Published')
+        page, error = parse_feed_page(request.query_params)
+        if error:
+            return Response({'reason': error}, status=status.HTTP_400_BAD_REQUEST)
+        limit, raw_cursor, cursor = page
 
-        serializer = TenderSerializer(tenders, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        def render():
+            tenders, next_cursor = keyset_page(published_tenders(service_types), cursor, limit)
+            return render_json_array(tenders), next_cursor
+
+        body, next_cursor = feed_cache.get_or_render(service_types, limit, raw_cursor, render)
+        response = HttpResponse(body, content_type='application/json')
+        if next_cursor:
+            response['X-Next-Cursor'] = next_cursor
+        return response
+
+
+class SearchTenders(APIView):
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+
+        if not query:
+            return Response({'reason': 'provide search query q'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(query) > MAX_SEARCH_QUERY_LENGTH:
+            return Response({'reason': f'q must be {MAX_SEARCH_QUERY_LENGTH} cherecters length maximum'}, status=status.HTTP_400_BAD_REQUEST)
+
+        limit = parse_limit(request.query_params.get('limit'))
+        if limit is None:
+            return Response({'reason': f'limit must be a number from 1 to {MAX_PAGE_LIMIT}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        offset = parse_offset(request.query_params.get('offset'))
+        if offset is None:
+            return Response({'reason': 'offset must be a non-negative number'}, status=status.HTTP_400_BAD_REQUEST)
+
+        tenders = search_tenders(query).values(*TenderSerializer.Meta.fields)[offset:offset + limit]
+        return HttpResponse(render_json_array(tenders), content_type='application/json')
 
 
 class GetUserTenders(APIView):
     def get(self, request):
-        username = request.query_params.get('username')
+        username = caller_username(request)
 
-        if not Employee.objects.filter(username=username).exists():
+        principal = get_principal(request, username)
+        if principal is None:
             return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        employee = Employee.objects.get(username=username)
-
-        if not OrganizationResponsible.objects.filter(user_id=employee).exists():
+        if not principal.organization_ids:
             return Response({'reason': f'user with username {username} does not belong to any organization'}, status=status.HTTP_400_BAD_REQUEST)
 
-        organization_responsibilities = OrganizationResponsible.objects.filter(user_id=employee)
-        organization_ids = organization_responsibilities.values_list('organization_id', flat=True)
-        tenders = Tender.objects.filter(organization__in=organization_ids).order_by('name')
+        tenders = Tender.objects.filter(organization__in=principal.organization_ids).order_by('name')
 
-        serializer = TenderSerializer(tenders, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if wants_stream(request):
+            return streaming_response(request, tenders, TenderSerializer.Meta.fields)
+
+        return HttpResponse(render_json_array(tenders.values(*TenderSerializer.Meta.fields)), content_type='application/json')
 
 
 class CreateTender(APIView):
@@ -80,39 +352,46 @@ class CreateTender(APIView):
         description = request.data.get('description')
         service_type = request.data.get('serviceType')
         organization_id = request.data.get('organizationId')
-        creator_username = request.data.get('creatorUsername')
+        creator_username = request.data.get('creatorUsername') or caller_username(request)
 
         if not (name and description and service_type and organization_id and creator_username):
             return Response({'reason': 'you must provide each of: name, description, serviceType, organizationId, creatorUsername'}, status=status.HTTP_400_BAD_REQUEST)
 
         organization = get_object_or_404(Organization, id=organization_id)
-        employee = get_object_or_404(Employee, username=creator_username)
+        principal = get_principal(request, creator_username)
+        if principal is None:
+            raise Http404
 
-        if not OrganizationResponsible.objects.filter(organization_id=organization, user_id=employee).exists():
+        if organization.id not in principal.organization_ids:
             return Response({'reason': f'user {creator_username} is not employee for organization {organization_id}'}, status=status.HTTP_403_FORBIDDEN)
 
-        tender = Tender.objects.create(name=name, description=description, service_type=service_type, organization=organization, creator=employee)
+        tender = Tender.objects.create(name=name, description=description, service_type=service_type, organization=organization, creator_id=principal.employee_id)
+        feed_cache.invalidate()
         serializer = TenderSerializer(tender)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return with_etag(Response(serializer.data, status=status.HTTP_200_OK), tender)
 
 
 class TenderStatus(APIView):
     def get(self, request, tenderId):
-        username = request.query_params.get('username')
+        username = caller_username(request)
 
         tender = get_object_or_404(Tender, id=tenderId)
 
         if tender.status != 'Published':
-            if not Employee.objects.filter(username=username).exists():
+            principal = get_principal(request, username)
+            if principal is None:
                 return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
-            if not check_access(tenderId, username):
+            if not check_access(tender, principal):
                 return Response({'reason': 'tender is not published, you do not have access because you do not belong to tender organizarion'}, status=status.HTTP_403_FORBIDDEN)
 
-        return Response(tender.status, status=status.HTTP_200_OK)
+        if if_none_match(request, tender):
+            return with_etag(Response(status=status.HTTP_304_NOT_MODIFIED), tender)
+
+        return with_etag(Response(tender.status, status=status.HTTP_200_OK), tender)
 
     def put(self, request, tenderId):
-        username = request.query_params.get('username')
+        username = caller_username(request)
         t_status = request.query_params.get('status')
 
         if not (tenderId and username and t_status):
@@ -120,25 +399,53 @@ class TenderStatus(APIView):
 
         tender = get_object_or_404(Tender, id=tenderId)
 
-        if not Employee.objects.filter(username=username).exists():
+        principal = get_principal(request, username)
+        if principal is None:
             return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        if not check_access(tenderId, username):
+        if not check_access(tender, principal):
             return Response({'reason': 'you do not have access because you do not belong to tender organizarion'}, status=status.HTTP_403_FORBIDDEN)
 
         if t_status not in ['Created', 'Published', 'Closed']:
-            Response({'reason': f'status may be one of: Created, Published, Closed'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'reason': f'status may be one of: Created, Published, Closed'}, status=status.HTTP_400_BAD_REQUEST)
 
+        if if_match_failed(request, tender) or not update_if_unchanged(tender, status=t_status):
+            return precondition_failed('tender')
         tender.status = t_status
-        tender.save()
+        feed_cache.invalidate()
+        change_stream.publish(change_stream.event('tender', tender))
 
         serializer = TenderSerializer(tender)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return with_etag(Response(serializer.data, status=status.HTTP_200_OK), tender)
+
+
+class BulkTenderStatus(APIView):
+    def put(self, request):
+        username = caller_username(request)
+        t_status = request.query_params.get('status')
+        ids = parse_ids(request.data.get('ids')) if isinstance(request.data, dict) else None
+
+        if not (username and t_status):
+            return Response({'reason': f'provide each of: username, status'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if ids is None:
+            return Response({'reason': f'ids must be a list of 1 to {MAX_BULK_IDS} tender ids'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if t_status not in ['Created', 'Published', 'Closed']:
+            return Response({'reason': f'status may be one of: Created, Published, Closed'}, status=status.HTTP_400_BAD_REQUEST)
+
+        principal = get_principal(request, username)
+        if principal is None:
+            return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        results = bulk_set_status(Tender, ids, t_status, principal, check_access, ['organization_id'])
+        feed_cache.invalidate()
+        return Response(results, status=status.HTTP_200_OK)
 
 
 class EditTender(APIView):
     def patch(self, request, tenderId):
-        username = request.query_params.get('username')
+        username = caller_username(request)
 
         name = request.data.get('name', '')
         description = request.data.get('description', '')
@@ -153,54 +460,61 @@ class EditTender(APIView):
 
         tender = get_object_or_404(Tender, id=tenderId)
 
-        if not Employee.objects.filter(username=username).exists():
+        principal = get_principal(request, username)
+        if principal is None:
             return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        if not check_access(tenderId, username):
+        if not check_access(tender, principal):
             return Response({'reason': 'you do not have access because you do not belong to tender organizarion'}, status=status.HTTP_403_FORBIDDEN)
 
-        tender_version = TenderVersion.objects.create(tender=tender, name=tender.name, description=tender.description, service_type=tender.service_type, version=tender.version)
-
+        changes = {}
         if name:
-            tender.name = name
+            changes['name'] = name
         if description:
-            tender.description = description
+            changes['description'] = description
         if service_type:
-            tender.service_type = service_type
-        tender.version += 1
-        tender.save()
+            changes['service_type'] = service_type
+
+        if if_match_failed(request, tender) or not save_new_version(tender, tender_versions, **changes):
+            return precondition_failed('tender')
+        feed_cache.invalidate()
+        change_stream.publish(change_stream.event('tender', tender))
 
         serializer = TenderSerializer(tender)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return with_etag(Response(serializer.data, status=status.HTTP_200_OK), tender)
 
 
 class RollbackTender(APIView):
     def put(self, request, tenderId, version):
-        username = request.query_params.get('username')
+        username = caller_username(request)
 
         if len(username) > 50:
             return Response({'reason': 'username must be 50 cherecters length maximum'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not Employee.objects.filter(username=username).exists():
+        principal = get_principal(request, username)
+        if principal is None:
             return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
         tender = get_object_or_404(Tender, id=tenderId)
-        tender_version = get_object_or_404(TenderVersion, tender=tender, version=version)
-
-        if not check_access(tenderId, username):
+        try:
+            tender_version = tender_versions.get(tender, version)
+        except archive.ArchiveError:
+            return archive_unavailable('tender', version)
+        if tender_version is None:
+            raise Http404
+
+        if not check_access(tender, principal):
             return Response({'reason': 'you do not have access because you do not belong to tender organizarion'}, status=status.HTTP_403_FORBIDDEN)
 
-        last_version = TenderVersion.objects.create(tender=tender, name=tender.name, description=tender.description,
-                                                    service_type=tender.service_type, version=tender.version)
-
-        tender.name = tender_version.name
-        tender.description = tender_version.description
-        tender.service_type = tender_version.service_type
-        tender.version += 1
-        tender.save()
+        if if_match_failed(request, tender) or not save_new_version(tender, tender_versions, name=tender_version.name,
+                                                                    description=tender_version.description,
+                                                                    service_type=tender_version.service_type):
+            return precondition_failed('tender')
+        feed_cache.invalidate()
+        change_stream.publish(change_stream.event('tender', tender))
 
         serializer = TenderSerializer(tender)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return with_etag(Response(serializer.data, status=status.HTTP_200_OK), tender)
 
 
 class CreateBid(APIView):
@@ -233,81 +547,79 @@ class CreateBid(APIView):
         if author_type == 'Organization':
             organization_responsible = OrganizationResponsible.objects.get(user_id=employee)
             organization = organization_responsible.organization_id
-            bid = Bid.objects.create(name=name, description=description, author_type=author_type, creator=employee, organization=organization)
+            bid = Bid.objects.create(name=name, description=description, author_type=author_type, creator=employee, organization=organization, tender=tender)
         else:
-            bid = Bid.objects.create(name=name, description=description, author_type=author_type, creator=employee)
+            bid = Bid.objects.create(name=name, description=description, author_type=author_type, creator=employee, tender=tender)
 
         serializer = BidSerializer(bid)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return with_etag(Response(serializer.data, status=status.HTTP_200_OK), bid)
 
 
 class UserBids(APIView):
     def get(self, request):
-        username = request.query_params.get('username')
+        username = caller_username(request)
 
         if len(username) > 50:
             return Response({'reason': 'username must be 50 cherecters length maximum'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not Employee.objects.filter(username=username).exists():
+        principal = get_principal(request, username)
+        if principal is None:
             return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        employee = Employee.objects.get(username=username)
-        bids = Bid.objects.filter(creator=employee).order_by('name')
-
-        if OrganizationResponsible.objects.filter(user_id=employee).exists():
-            organization_responsible = OrganizationResponsible.objects.get(user_id=employee)
-            organization = organization_responsible.organization_id
-            bids2 = Bid.objects.filter(organization=organization).order_by('name')
-        else:
-            bids2 = Bid.objects.none()
+        bids = Bid.objects.filter(Q(creator_id=principal.employee_id) | Q(organization__in=principal.organization_ids)).order_by('name')
 
-        combined_bids = (bids | bids2).distinct().order_by('name')
+        if wants_stream(request):
+            return streaming_response(request, bids, BidSerializer.Meta.fields)
 
-        serializer = BidSerializer(combined_bids, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return HttpResponse(render_json_array(bids.values(*BidSerializer.Meta.fields)), content_type='application/json')
 
 
 class TenderBids(APIView):
     def get(self, request, tenderId):
-        username = request.query_params.get('username')
+        username = caller_username(request)
 
         if len(username) > 50:
             return Response({'reason': 'username must be 50 cherecters length maximum'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not Employee.objects.filter(username=username).exists():
+        principal = get_principal(request, username)
+        if principal is None:
             return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        employee = Employee.objects.get(username=username)
         tender = get_object_or_404(Tender, id=tenderId)
 
-        if not check_access(tenderId, username):
+        if not check_access(tender, principal):
             return Response({'reason': 'you do not have access because you do not belong to tender organizarion'}, status=status.HTTP_403_FORBIDDEN)
 
-        if not Bid.objects.filter(tender=tender, status='Published').exists():
+        # A bid is never older than its tender; with partitioned tables the bound skips older partitions.
+        bids = list(Bid.objects.filter(tender=tender, status='Published', created_at__gte=tender.created_at)
+                    .values(*BidSerializer.Meta.fields))
+        if not bids:
             return Response({'reason': 'bids not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        bids = Bid.objects.filter(tender=tender, status='Published')
-        serializer = BidSerializer(bids, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return HttpResponse(render_json_array(bids), content_type='application/json')
 
 
 class BidStatus(APIView):
     def get(self, request, bidId):
-        username = request.query_params.get('username')
+        username = caller_username(request)
 
         bid = get_object_or_404(Bid, id=bidId)
 
         if bid.status != 'Published':
-            if not Employee.objects.filter(username=username).exists():
+            principal = get_principal(request, username)
+            if principal is None:
                 return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
-            if not check_access_for_bid(bidId, username):
+            if not check_access_for_bid(bid, principal):
                 return Response({'reason': 'bid is not published, you do not have access because you do not belong to bid organizarion or you are not bid creator'}, status=status.HTTP_403_FORBIDDEN)
 
-        return Response(bid.status, status=status.HTTP_200_OK)
+        if if_none_match(request, bid):
+            return with_etag(Response(status=status.HTTP_304_NOT_MODIFIED), bid)
+
+        return with_etag(Response(bid.status, status=status.HTTP_200_OK), bid)
 
     def put(self, request, bidId):
-        username = request.query_params.get('username')
+        username = caller_username(request)
         t_status = request.query_params.get('status')
 
         if not (bidId and username and t_status):
@@ -315,25 +627,78 @@ class BidStatus(APIView):
 
         bid = get_object_or_404(Bid, id=bidId)
 
-        if not Employee.objects.filter(username=username).exists():
+        principal = get_principal(request, username)
+        if principal is None:
             return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        if not check_access_for_bid(bidId, username):
+        if not check_access_for_bid(bid, principal):
             return Response({'reason': 'you do not have access because you do not belong to bid organizarion or you are not bid creator'}, status=status.HTTP_403_FORBIDDEN)
 
         if t_status not in ['Created', 'Published', 'Cancelled']:
-            Response({'reason': f'status may be one of: Created, Published, Cancelled'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'reason': f'status may be one of: Created, Published, Cancelled'}, status=status.HTTP_400_BAD_REQUEST)
 
+        if if_match_failed(request, bid) or not update_if_unchanged(bid, status=t_status):
+            return precondition_failed('bid')
         bid.status = t_status
-        bid.save()
+        change_stream.publish(change_stream.event('bid', bid))
 
         serializer = BidSerializer(bid)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return with_etag(Response(serializer.data, status=status.HTTP_200_OK), bid)
+
+
+class BulkBidStatus(APIView):
+    def put(self, request):
+        username = caller_username(request)
+        t_status = request.query_params.get('status')
+        ids = parse_ids(request.data.get('ids')) if isinstance(request.data, dict) else None
+
+        if not (username and t_status):
+            return Response({'reason': f'provide each of: username, status'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if ids is None:
+            return Response({'reason': f'ids must be a list of 1 to {MAX_BULK_IDS} bid ids'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if t_status not in ['Created', 'Published', 'Cancelled']:
+            return Response({'reason': f'status may be one of: Created, Published, Cancelled'}, status=status.HTTP_400_BAD_REQUEST)
+
+        principal = get_principal(request, username)
+        if principal is None:
+            return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        results = bulk_set_status(Bid, ids, t_status, principal, check_access_for_bid, ['organization_id', 'creator_id'])
+        return Response(results, status=status.HTTP_200_OK)
+
+
+class BatchStatus(APIView):
+    # Takes the ids in a POST body, but only reads: see service.routing.reads_only.
+    read_only = True
+
+    def post(self, request):
+        username = caller_username(request)
+        # A body that is not an object names no ids and gets the 400 below.
+        data = request.data if isinstance(request.data, dict) else {}
+        tender_ids = parse_ids(data['tenders']) if data.get('tenders') else []
+        bid_ids = parse_ids(data['bids']) if data.get('bids') else []
+
+        if tender_ids is None or bid_ids is None or not (tender_ids or bid_ids) or len(tender_ids) + len(bid_ids) > MAX_BULK_IDS:
+            return Response({'reason': f'provide tenders and/or bids: lists of ids, {MAX_BULK_IDS} in total maximum'}, status=status.HTTP_400_BAD_REQUEST)
+
+        principal = None
+        if username:
+            principal = get_principal(request, username)
+            if principal is None:
+                return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        results = {
+            'tenders': lookup_statuses(Tender, tender_ids, principal, check_access, ['organization_id']),
+            'bids': lookup_statuses(Bid, bid_ids, principal, check_access_for_bid, ['organization_id', 'creator_id']),
+        }
+        return Response(results, status=status.HTTP_200_OK)
 
 
 class EditBid(APIView):
     def patch(self, request, bidId):
-        username = request.query_params.get('username')
+        username = caller_username(request)
 
         name = request.data.get('name', '')
         description = request.data.get('description', '')
@@ -345,56 +710,61 @@ class EditBid(APIView):
 
         bid = get_object_or_404(Bid, id=bidId)
 
-        if not Employee.objects.filter(username=username).exists():
+        principal = get_principal(request, username)
+        if principal is None:
             return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        if not check_access_for_bid(bidId, username):
+        if not check_access_for_bid(bid, principal):
             return Response({'reason': 'you do not have access because you do not belong to bid organizarion or you are not bid creator'}, status=status.HTTP_403_FORBIDDEN)
 
-        bid_version = BidVersion.objects.create(bid=bid, name=bid.name, description=bid.description, version=bid.version)
-
+        changes = {}
         if name:
-            bid.name = name
+            changes['name'] = name
         if description:
-            bid.description = description
-        bid.version += 1
-        bid.save()
+            changes['description'] = description
+
+        if if_match_failed(request, bid) or not save_new_version(bid, bid_versions, **changes):
+            return precondition_failed('bid')
+        change_stream.publish(change_stream.event('bid', bid))
 
         serializer = BidSerializer(bid)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return with_etag(Response(serializer.data, status=status.HTTP_200_OK), bid)
 
 
 class RollbackBid(APIView):
     def put(self, request, bidId, version):
-        username = request.query_params.get('username')
+        username = caller_username(request)
 
         if len(username) > 50:
             return Response({'reason': 'username must be 50 cherecters length maximum'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not Employee.objects.filter(username=username).exists():
+        principal = get_principal(request, username)
+        if principal is None:
             return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
         bid = get_object_or_404(Bid, id=bidId)
-        bid_version = get_object_or_404(BidVersion, bid=bid, version=version)
-
-        if not check_access_for_bid(bidId, username):
+        try:
+            bid_version = bid_versions.get(bid, version)
+        except archive.ArchiveError:
+            return archive_unavailable('bid', version)
+        if bid_version is None:
+            raise Http404
+
+        if not check_access_for_bid(bid, principal):
             return Response({'reason': 'you do not have access because you do not belong to bid organizarion or you are not bid creator'}, status=status.HTTP_403_FORBIDDEN)
 
-        last_version = BidVersion.objects.create(bid=bid, name=bid.name, description=bid.description, version=bid.version)
-
-        bid.name = bid_version.name
-        bid.description = bid_version.description
-        bid.service_type = bid_version.service_type
-        bid.version += 1
-        bid.save()
+        if if_match_failed(request, bid) or not save_new_version(bid, bid_versions, name=bid_version.name,
+                                                                 description=bid_version.description):
+            return precondition_failed('bid')
+        change_stream.publish(change_stream.event('bid', bid))
 
         serializer = BidSerializer(bid)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return with_etag(Response(serializer.data, status=status.HTTP_200_OK), bid)
 
 
 class SubmitDecision(APIView):
     def put(self, request, bidId):
-        username = request.query_params.get('username')
+        username = caller_username(request)
         decision = request.query_params.get('decision')
 
         if len(username) > 50:
@@ -403,13 +773,14 @@ class SubmitDecision(APIView):
         if decision not in ['Approved', 'Rejected']:
             return Response({'reason': 'decision must be Approved or Rejected'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not Employee.objects.filter(username=username).exists():
+        principal = get_principal(request, username)
+        if principal is None:
             return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        bid = get_object_or_404(Bid, id=bidId)
+        bid = get_object_or_404(Bid.objects.select_related('tender__organization'), id=bidId)
         tender = bid.tender
 
-        if not check_access(tender.id, username):
+        if not check_access(tender, principal):
             return Response({'reason': 'you do not have access because you do not belong to tender organizarion'}, status=status.HTTP_403_FORBIDDEN)
 
         if bid.status == 'Cancelled':
@@ -418,38 +789,42 @@ class SubmitDecision(APIView):
         if bid.approved is not None:
             return Response({'reason': 'bid already has decision'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if decision == 'Rejected':
-            bid.approved = False
-            bid.status = 'Cancelled'
-        else:
-            bid.approvements += 1
-            responsible_employees = OrganizationResponsible.objects.filter(organization_id=tender.organization).count()
-            if bid.approvements >= min(3, responsible_employees):
-                bid.approved = True
+        if if_match_failed(request, bid):
+            return precondition_failed('bid')
+
+        try:
+            decided = record_decision(bid, principal, decision, min(3, tender.organization.responsible_count))
+        except IntegrityError:
+            return Response({'reason': 'you have already submitted a decision for this bid'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not decided:
+            return Response({'reason': 'bid already has decision'}, status=status.HTTP_400_BAD_REQUEST)
+        bid.refresh_from_db(fields=['status', 'approvements', 'approved'])
+        change_stream.publish(change_stream.event('bid', bid))
 
-        bid.save()
         serializer = BidSerializer(bid)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return with_etag(Response(serializer.data, status=status.HTTP_200_OK), bid)
 
 
 class SendFeedback(APIView):
     def put(self, request, bidId):
         review = request.query_params.get('bidFeedback')
-        username = request.query_params.get('username')
+        username = caller_username(request)
 
-        if not Employee.objects.filter(username=username).exists():
+        principal = get_principal(request, username)
+        if principal is None:
             return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        bid = get_object_or_404(Bid, id=bidId)
+        bid = get_object_or_404(Bid.objects.select_related('tender'), id=bidId)
         tender = bid.tender
 
-        if not check_access(tender.id, username):
+        if not check_access(tender, principal):
             return Response({'reason': 'you do not have access because you do not belong to tender organizarion'}, status=status.HTTP_403_FORBIDDEN)
 
         if not bid.approved:
             return Response({'reason': 'you can not send feedback because bid was not approved'}, status=status.HTTP_400_BAD_REQUEST)
 
-        feedback = Feedback.objects.create(bid=bid, description=review, executor=bid.creator)
+        Feedback.objects.create(bid=bid, description=review, executor_id=bid.creator_id)
         serializer = BidSerializer(bid)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -457,31 +832,68 @@ class SendFeedback(APIView):
 class GetFeedback(APIView):
     def get(self, request, tenderId):
         author_username = request.query_params.get('authorUsername')
-        requester_username = request.query_params.get('requesterUsername')
+        requester_username = request.query_params.get('requesterUsername') or caller_username(request)
 
-        if not Employee.objects.filter(username=requester_username).exists():
-            return Response({'reason': f'user with username {requester_username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
+        limit = parse_limit(request.query_params.get('limit'))
+        if limit is None:
+            return Response({'reason': f'limit must be a number from 1 to {MAX_PAGE_LIMIT}'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not Employee.objects.filter(username=author_username).exists():
-            return Response({'reason': f'user with username {author_username} does not exist'}, status=status.HTTP_400_BAD_REQUEST)
+        cursor = None
+        if request.query_params.get('cursor'):
+            cursor = decode_cursor(request.query_params['cursor'])
+            if cursor is None:
+                return Response({'reason': 'invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
 
-        author = Employee.objects.get(username=author_username)
+        principal = get_principal(request, requester_username)
+        if principal is None:
+            return Response({'reason': f'user with username {requester_username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        tender = get_object_or_404(Tender, id=tenderId)
+        author = Employee.objects.only('id', 'review_count', 'last_reviewed_at').filter(username=author_username).first()
+        if author is None:
+            return Response({'reason': f'user with username {author_username} does not exist'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not Bid.objects.filter(tender=tender).exists():
-            return Response({'reason': f'no bids found'}, status=status.HTTP_400_BAD_REQUEST)
+        tender = get_object_or_404(Tender.objects.only('organization_id'), id=tenderId)
 
-        if not check_access(tender.id, requester_username):
+        if not check_access(tender, principal):
             return Response({'reason': 'you do not have access because you do not belong to tender organizarion'}, status=status.HTTP_403_FORBIDDEN)
 
-        feedbacks = Feedback.objects.get(executor=author)
-        serializer = FeedbackSerializer(feedbacks, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Rendered from .values(), so the join on bid is the filter itself rather than a select_related.
+        reviews = Feedback.objects.filter(executor=author, bid__tender=tender).values(*FeedbackSerializer.Meta.fields)
+        page, next_cursor = keyset_page(reviews, cursor, limit)
 
+        if not page and not cursor and not Bid.objects.filter(tender=tender).exists():
+            return Response({'reason': f'no bids found'}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = HttpResponse(render_json_array(page), content_type='application/json')
+        if next_cursor:
+            response['X-Next-Cursor'] = next_cursor
+        # The author's reputation summary across all tenders, maintained on every new review.
+        response['X-Review-Count'] = author.review_count
+        if author.last_reviewed_at:
+            response['X-Last-Review-At'] = author.last_reviewed_at.isoformat()
+        return response
 
 
+class ChangeStream(APIView):
+    def get(self, request):
+        username = caller_username(request)
+        tender_ids = parse_watched_ids(request.query_params.get('tenders'))
+        bid_ids = parse_watched_ids(request.query_params.get('bids'))
 
+        if tender_ids is None or bid_ids is None or not (tender_ids or bid_ids) or len(tender_ids) + len(bid_ids) > MAX_WATCHED_IDS:
+            return Response({'reason': f'provide tenders and/or bids: comma-separated ids, {MAX_WATCHED_IDS} in total maximum'}, status=status.HTTP_400_BAD_REQUEST)
 
+        principal = None
+        if username:
+            principal = get_principal(request, username)
+            if principal is None:
+                return Response({'reason': f'user with username {username} does not exist'}, status=status.HTTP_401_UNAUTHORIZED)
 
+        # Subscribed before the snapshot is read, so no change can fall in between.
+        subscription = change_stream.broker.subscribe(change_stream.Subscription(watched_keys(tender_ids, bid_ids)))
+        snapshot = change_snapshot(tender_ids, bid_ids, principal)
+        if snapshot is None:
+            change_stream.broker.unsubscribe(subscription)
+            return Response({'reason': 'some of the objects are not published and you do not have access to them'}, status=status.HTTP_403_FORBIDDEN)
 
+        return event_stream_response(change_stream.stream(subscription, snapshot, settings.CHANGE_STREAM_TIMEOUT))